@@ -7,6 +7,8 @@ from pymongo import MongoClient
 from bson import ObjectId
 import os
 
+from fast_json import install as install_fast_json, respond
+
 # ✅ FastAPI Instance
 app = FastAPI(title="Expenses API - INR (MongoDB)", version="2.0.0")
 
@@ -19,6 +21,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# FAST_JSON=1 pe bade responses compress hote hain
+install_fast_json(app)
+
 # ============================================================================
 # 📦 MONGODB CONNECTION (Optimized for Serverless)
 # ============================================================================
@@ -99,7 +104,7 @@ async def get_all_transactions():
     income = summary_row.get("monthly_income", 0)
     expenses = summary_row.get("total_expenses", 0)
 
-    return {
+    return respond({
         "summary": {
             "totalBalance": balance,
             "monthlyIncome": income,
@@ -111,7 +116,7 @@ async def get_all_transactions():
         "categorySpending": category_list,
         "recentTransactions": txs,
         "monthlyTrends": [{"month": "Current", "income": income, "expenses": expenses}]
-    }
+    })
 
 # Pydantic Model
 class Transaction(BaseModel):
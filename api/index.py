@@ -1,14 +1,25 @@
 from fastapi import FastAPI, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional, List
 from datetime import datetime, timedelta
-from pymongo import MongoClient
+from pymongo import DESCENDING, MongoClient, ReplaceOne, UpdateOne
 from bson import ObjectId
 import os
 
+from coherence import coherence
+from fast_json import install as install_fast_json, respond
+from idempotency import MongoIdempotencyStore, install as install_idempotency
+from rate_cache import BASE_CURRENCY, FxCache
+from sketch import MERCHANT_SKETCH_CAPACITY, SpaceSaving, format_top, merchant_weights, normalise_description, place_new_keys
+
 app = FastAPI(title="Expenses API - INR (MongoDB)", version="2.0.0")
 
+# Serverless timeout ke baad client retry kare toh duplicate insert/recompute nahi -
+# stored response replay (idempotency_keys TTL collection). CORS se pehle lagao.
+idempotency_store = MongoIdempotencyStore(lambda: get_db()["idempotency_keys"])
+install_idempotency(app, idempotency_store)
+
 # ✅ CORS Setup: Frontend connection ke liye zaroori
 app.add_middleware(
     CORSMiddleware,
@@ -18,6 +29,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# FAST_JSON=1 pe bade responses compress hote hain
+install_fast_json(app)
+
 # ✅ MONGODB CONNECTION (Optimized for Serverless)
 # Vercel har request par naya process chalata hai, isliye connection handle karna zaroori hai
 MONGODB_URI = os.getenv("MONGODB_URI")
@@ -47,19 +61,46 @@ def get_collections():
     return {
         "tx_col": database["transactions"],
         "cat_col": database["categories"],
-        "sum_col": database["summary"]
+        "sum_col": database["summary"],
+        "arch_col": database["archives"],
+        "meta_col": database["meta"],
+        "merchant_col": database["merchant_counters"],
+        "fx_col": database["fx_rates"]
     }
 
+# Summary + categories ka in-process cache (meta.cache_version se sync)
+dashboard_cache = {}
+coherence.register(dashboard_cache.clear)
+
+# (currency, day) -> resolved FX rate - har insert pe find_one nahi
+fx_cache = FxCache()
+coherence.register(fx_cache.invalidate)
+
+def mark_written(cols):
+    """Har write ke baad - apna cache clear + shared version +1 (dusre workers ke liye)"""
+    dashboard_cache.clear()
+    coherence.bump_mongo(cols["meta_col"])
+
+# Archived saal ka apna collection (transactions_2023 etc.)
+def archive_collection(year):
+    return get_db()[f"transactions_{year}"]
+
 # ============================================================================
 # 📋 MODELS & HELPERS
 # ============================================================================
 
 class Transaction(BaseModel):
     description: str
-    amount: float
+    amount: float  # currency mein (default INR)
     date: str
     category: str
     status: str = "completed"
+    currency: str = "INR"
+
+class FxRateIn(BaseModel):
+    currency: str
+    day: str
+    rate_to_inr: float = Field(gt=0)
 
 def serialize_doc(doc):
     if doc and "_id" in doc:
@@ -67,6 +108,62 @@ def serialize_doc(doc):
         del doc["_id"]
     return doc
 
+def archived_totals(cols):
+    """Archived years ke frozen rollups ka jod (income, expenses)"""
+    income = expenses = 0
+    for rollup in cols["arch_col"].find({}, {"total_income": 1, "total_expenses": 1}):
+        income += rollup.get("total_income", 0)
+        expenses += rollup.get("total_expenses", 0)
+    return income, expenses
+
+def convert_to_inr(cols, tx_dict):
+    """
+    Foreign currency amount ko us din (ya usse pehle ke latest) rate se INR mein.
+    'amount' INR ban jata hai, 'original_amount' + 'currency' original wale.
+    """
+    currency = (tx_dict.get("currency") or BASE_CURRENCY).upper()
+    tx_dict["currency"] = currency
+    tx_dict["original_amount"] = tx_dict["amount"]
+    if currency == BASE_CURRENCY:
+        return tx_dict
+    key = (currency, tx_dict["date"][:10])
+    # Dusre worker ne naye rates daale hon toh cache clear
+    coherence.sync_mongo(cols["meta_col"])
+    epoch = fx_cache.epoch
+    rate = fx_cache.get_many([key]).get(key)
+    if rate is None:
+        doc = cols["fx_col"].find_one(
+            {"currency": currency, "day": {"$lte": key[1]}}, sort=[("day", DESCENDING)]
+        )
+        if doc is None:
+            raise HTTPException(status_code=400, detail=f"{currency} ka {key[1]} ya usse pehle ka FX rate nahi mila")
+        rate = doc["rate_to_inr"]
+        fx_cache.put_many({key: rate}, epoch)
+    tx_dict["amount"] = round(tx_dict["amount"] * rate, 2)
+    return tx_dict
+
+def record_merchants(cols, rows):
+    """Top merchants sketch update - tracked keys $inc, naye keys ke liye bounded eviction"""
+    weights = merchant_weights(rows)
+    if not weights:
+        return
+    merchant_col = cols["merchant_col"]
+    tracked = {doc["_id"] for doc in merchant_col.find({"_id": {"$in": list(weights)}}, {"_id": 1})}
+    if tracked:
+        merchant_col.bulk_write([UpdateOne({"_id": name}, {"$inc": {"count": weights[name]}}) for name in tracked])
+    
+    new_weights = {name: weight for name, weight in weights.items() if name not in tracked}
+    if new_weights:
+        persisted = [(d["_id"], d["count"], d["error"]) for d in merchant_col.find({})]
+        new_rows, evicted = place_new_keys(persisted, new_weights)
+        if evicted:
+            merchant_col.delete_many({"_id": {"$in": evicted}})
+        if new_rows:
+            merchant_col.bulk_write([
+                ReplaceOne({"_id": name}, {"count": count, "error": error}, upsert=True)
+                for name, count, error in new_rows
+            ])
+
 # ============================================================================
 # 🏠 ENDPOINTS (Vercel ke hisaab se paths fix kiye hain)
 # ============================================================================
@@ -92,12 +189,19 @@ async def health():
 async def get_all_transactions():
     cols = get_collections()
     
-    # Get summary
-    summary = cols["sum_col"].find_one({}) or {"total_balance": 0, "monthly_income": 0, "total_expenses": 0}
+    # Kisi aur worker ne likha ho toh cache clear
+    coherence.sync_mongo(cols["meta_col"])
     
-    # Get categories
-    categories = list(cols["cat_col"].find({"total_spent": {"$gt": 0}}))
-    categories = [{"name": c["name"], "value": c["total_spent"], "color": c["color"]} for c in categories]
+    if "summary" not in dashboard_cache:
+        # Get summary
+        summary = cols["sum_col"].find_one({}) or {"total_balance": 0, "monthly_income": 0, "total_expenses": 0}
+        
+        # Get categories
+        categories = list(cols["cat_col"].find({"total_spent": {"$gt": 0}}))
+        categories = [{"name": c["name"], "value": c["total_spent"], "color": c["color"]} for c in categories]
+        dashboard_cache.update(summary=summary, categories=categories)
+    summary = dashboard_cache["summary"]
+    categories = dashboard_cache["categories"]
     
     # Get recent (limit 20)
     txs = list(cols["tx_col"].find().sort([("date", -1), ("_id", -1)]).limit(20))
@@ -106,7 +210,7 @@ async def get_all_transactions():
     income = summary.get("monthly_income", 0)
     expenses = summary.get("total_expenses", 0)
 
-    return {
+    return respond({
         "summary": {
             "totalBalance": summary.get("total_balance", 0),
             "monthlyIncome": income,
@@ -118,38 +222,166 @@ async def get_all_transactions():
         "categorySpending": categories,
         "recentTransactions": txs,
         "monthlyTrends": [{"month": "Current", "income": income, "expenses": expenses}]
-    }
+    })
 
 @app.post("/api/transactions")
 async def add_transaction(transaction: Transaction):
     cols = get_collections()
-    tx_dict = transaction.dict()
+    tx_dict = convert_to_inr(cols, transaction.dict())
+    # Insert se pehle - crash ke baad retry dobara insert na kare
+    idempotency_store.mark_committed()
     result = cols["tx_col"].insert_one(tx_dict)
+    record_merchants(cols, [tx_dict])
     
     # Simple Recalculate (Serverless friendly)
     all_txs = list(cols["tx_col"].find({}))
     total_expenses = sum(abs(t["amount"]) for t in all_txs if t["amount"] < 0)
     total_income = sum(t["amount"] for t in all_txs if t["amount"] > 0)
     
+    # Archived years ke frozen rollups bhi jodo
+    archived_income, archived_expenses = archived_totals(cols)
+    total_income += archived_income
+    total_expenses += archived_expenses
+    
     cols["sum_col"].update_one({}, {"$set": {
         "total_expenses": total_expenses,
         "monthly_income": total_income,
         "total_balance": total_income - total_expenses
     }}, upsert=True)
+    mark_written(cols)
     
     return {"message": "✅ Added", "id": str(result.inserted_id)}
 
+@app.get("/api/transactions/list")
+async def get_transaction_list(start: Optional[str] = None, end: Optional[str] = None):
+    """Hot collection + sirf wahi archive collections jo date range maange"""
+    cols = get_collections()
+    date_filter = {}
+    if start:
+        date_filter["$gte"] = start
+    if end:
+        date_filter["$lte"] = end
+    query = {"date": date_filter} if date_filter else {}
+    
+    txs = list(cols["tx_col"].find(query).sort("date", -1))
+    # Range na ho toh saare archived years (poora ledger)
+    archived = False
+    for rollup in cols["arch_col"].find({}, {"year": 1}).sort("year", -1):
+        year = rollup["year"]
+        if (not start or start < f"{year + 1}-01-01") and (not end or end >= f"{year}-01-01"):
+            txs.extend(archive_collection(year).find(query).sort("date", -1))
+            archived = True
+    if archived:
+        txs.sort(key=lambda t: t["date"], reverse=True)
+    
+    return respond([serialize_doc(tx) for tx in txs])
+
+@app.post("/api/archive/{year}")
+async def archive_year(year: int):
+    """Closed year ke transactions transactions_<year> collection mein move"""
+    cols = get_collections()
+    if year >= datetime.now().year:
+        raise HTTPException(status_code=400, detail="Sirf closed (pichle) saal archive ho sakte hain")
+    if cols["arch_col"].find_one({"year": year}):
+        raise HTTPException(status_code=400, detail=f"{year} pehle se archived hai")
+    
+    year_filter = {"date": {"$gte": f"{year}-01-01", "$lt": f"{year + 1}-01-01"}}
+    docs = list(cols["tx_col"].find(year_filter))
+    idempotency_store.mark_committed()
+    if docs:
+        # Upsert by _id - adhoora pichla run dobara chale toh duplicate nahi
+        archive_collection(year).bulk_write([ReplaceOne({"_id": d["_id"]}, d, upsert=True) for d in docs])
+        archive_collection(year).create_index("date")
+        cols["tx_col"].delete_many({"_id": {"$in": [d["_id"] for d in docs]}})
+    
+    rollup = {
+        "year": year,
+        "collection": f"transactions_{year}",
+        "transaction_count": len(docs),
+        "total_income": sum(d["amount"] for d in docs if d["amount"] > 0),
+        "total_expenses": sum(abs(d["amount"]) for d in docs if d["amount"] < 0),
+        "archived_at": datetime.now().isoformat()
+    }
+    cols["arch_col"].insert_one(dict(rollup))
+    mark_written(cols)
+    return {"message": f"✅ {year} archived", **rollup}
+
+@app.get("/api/fx/rates")
+async def get_fx_rates(currency: Optional[str] = None):
+    """Stored FX rates (currency diya toh sirf uske)"""
+    cols = get_collections()
+    query = {"currency": currency.upper()} if currency else {}
+    return list(cols["fx_col"].find(query, {"_id": 0}).sort([("currency", 1), ("day", 1)]))
+
+@app.post("/api/fx/rates")
+async def add_fx_rates(rates: List[FxRateIn]):
+    """Per-day FX rates upsert (1 unit = kitne INR)"""
+    cols = get_collections()
+    if rates:
+        # Unique index pehle - concurrent upserts duplicate (currency, day) na bana sakein
+        cols["fx_col"].create_index([("currency", 1), ("day", 1)], unique=True)
+        cols["fx_col"].bulk_write([
+            UpdateOne(
+                {"currency": r.currency.upper(), "day": r.day[:10]},
+                {"$set": {"rate_to_inr": r.rate_to_inr}},
+                upsert=True
+            )
+            for r in rates
+        ])
+        fx_cache.invalidate({r.currency.upper() for r in rates})
+        mark_written(cols)
+    return {"message": f"✅ {len(rates)} FX rates loaded"}
+
+@app.get("/api/insights/top-merchants")
+async def get_top_merchants(k: int = 10):
+    """Sabse zyada baar aaye merchants - merchant_counters (bounded) se"""
+    if not 1 <= k <= MERCHANT_SKETCH_CAPACITY:
+        raise HTTPException(status_code=400, detail=f"k 1 se {MERCHANT_SKETCH_CAPACITY} ke beech hona chahiye")
+    cols = get_collections()
+    docs = cols["merchant_col"].find({}).sort([("count", DESCENDING), ("_id", 1)]).limit(k)
+    return {
+        "k": k,
+        "capacity": MERCHANT_SKETCH_CAPACITY,
+        "merchants": format_top((d["_id"], d["count"], d["error"]) for d in docs)
+    }
+
+@app.post("/api/insights/top-merchants/rebuild")
+async def rebuild_top_merchants():
+    """Hot + archived collections stream karke sketch dobara banata hai"""
+    cols = get_collections()
+    sketch = SpaceSaving()
+    expense_filter = {"amount": {"$lt": 0}}
+    sources = [cols["tx_col"]] + [archive_collection(r["year"]) for r in cols["arch_col"].find({}, {"year": 1})]
+    for source in sources:
+        for doc in source.find(expense_filter, {"description": 1}):
+            sketch.update(normalise_description(doc.get("description")))
+    
+    rows = sketch.rows()
+    cols["merchant_col"].delete_many({})
+    if rows:
+        cols["merchant_col"].insert_many([{"_id": name, "count": count, "error": error} for name, count, error in rows])
+    cols["merchant_col"].create_index("count")
+    return {"message": "✅ Top merchants rebuilt", "tracked": len(rows)}
+
 @app.delete("/api/transactions/{transaction_id}")
 async def delete_transaction(transaction_id: str):
     cols = get_collections()
+    idempotency_store.mark_committed()
     cols["tx_col"].delete_one({"_id": ObjectId(transaction_id)})
+    mark_written(cols)
     return {"message": "✅ Deleted"}
 
 @app.delete("/api/reset")
 async def reset_database():
     cols = get_collections()
     cols["tx_col"].delete_many({})
+    cols["merchant_col"].delete_many({})
+    # Archived partitions bhi - warna agla POST unke rollups summary mein wapas jod deta
+    for rollup in cols["arch_col"].find({}, {"year": 1}):
+        archive_collection(rollup["year"]).drop()
+    cols["arch_col"].delete_many({})
     cols["sum_col"].update_one({}, {"$set": {"total_balance": 0, "monthly_income": 0, "total_expenses": 0}}, upsert=True)
+    mark_written(cols)
     return {"message": "⚠️ Reset complete"}
 
 # Vercel ko batane ke liye ki app yahi hai
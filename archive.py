@@ -0,0 +1,169 @@
+"""
+🗄️ Archive - hot/cold ledger partitioning
+
+Band ho chuke saal (year < current year) ke transactions finance.db se
+nikal ke archives/finance_<year>.db mein chale jaate hain. Us saal ke
+rollups (archived_years + monthly_category_totals) freeze ho jaate hain,
+toh hot table chhoti rehti hai aur writes/indexes/backups fast rehte hain.
+
+Archive files sirf tab padhi jaati hain jab query ki date range unhe maange.
+"""
+
+import heapq
+import os
+import sqlite3
+from datetime import datetime
+
+from sqlalchemy import case, func, select, text, update
+
+import models
+from database import IS_SQLITE, engine
+
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "archives")
+
+ARCHIVE_COLUMNS = "id, description, amount, date, category, status, currency, original_amount"
+
+
+class ArchiveError(ValueError):
+    """Archive se related galat request"""
+
+
+def archive_path(year):
+    return os.path.join(ARCHIVE_DIR, f"finance_{year}.db")
+
+def archived_years(session):
+    return set(session.scalars(select(models.ArchivedYear.year)))
+
+def check_writable(session, dates):
+    """Archived (frozen) saal mein naya write allowed nahi"""
+    years = {int(date[:4]) for date in dates if date}
+    frozen = years & archived_years(session) if years else set()
+    if frozen:
+        raise ArchiveError(f"{min(frozen)} archive ho chuka hai - us saal mein write nahi ho sakta")
+
+def archive_year(year):
+    """
+    Ek closed year ko archive file mein move karta hai (ek transaction mein).
+    Apna connection use karta hai kyunki ATTACH/DETACH same connection pe chahiye.
+    """
+    if not IS_SQLITE:
+        raise ArchiveError("Archiving sirf SQLite backend pe supported hai")
+    if year >= datetime.now().year:
+        raise ArchiveError("Sirf closed (pichle) saal archive ho sakte hain")
+
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    path = archive_path(year)
+    bounds = {"start": f"{year}-01-01", "end": f"{year + 1}-01-01"}
+    tx = models.Transaction
+
+    with engine.connect() as conn:
+        # ATTACH transaction ke bahar hona chahiye - raw connection pe, BEGIN se pehle
+        raw = conn.connection.dbapi_connection
+        raw.execute("ATTACH DATABASE ? AS archive", (path,))
+        try:
+            if conn.execute(select(models.ArchivedYear.year).where(models.ArchivedYear.year == year)).first():
+                raise ArchiveError(f"{year} pehle se archived hai")
+
+            conn.execute(text("""
+                CREATE TABLE IF NOT EXISTS archive.transactions (
+                    id INTEGER PRIMARY KEY,
+                    description TEXT NOT NULL,
+                    amount REAL NOT NULL,
+                    date TEXT NOT NULL,
+                    category TEXT NOT NULL,
+                    status TEXT,
+                    currency TEXT NOT NULL DEFAULT 'INR',
+                    original_amount REAL
+                )
+            """))
+            conn.execute(text("CREATE INDEX IF NOT EXISTS archive.ix_transactions_date ON transactions (date)"))
+
+            count, income, expenses = conn.execute(
+                select(
+                    func.count(),
+                    func.sum(case((tx.amount > 0, tx.amount), else_=0)),
+                    func.sum(case((tx.amount < 0, func.abs(tx.amount)), else_=0)),
+                ).where(tx.date >= bounds["start"], tx.date < bounds["end"])
+            ).one()
+
+            # File mein purane (reset/adhoore run ke) rows ho toh saaf karo
+            conn.execute(text("DELETE FROM archive.transactions"))
+            conn.execute(text(f"""
+                INSERT INTO archive.transactions ({ARCHIVE_COLUMNS})
+                SELECT {ARCHIVE_COLUMNS} FROM main.transactions
+                WHERE date >= :start AND date < :end
+            """), bounds)
+            conn.execute(text("DELETE FROM main.transactions WHERE date >= :start AND date < :end"), bounds)
+
+            rollup = {
+                "year": year,
+                "path": path,
+                "transaction_count": count,
+                "total_income": income or 0,
+                "total_expenses": expenses or 0,
+                "archived_at": datetime.now().isoformat(),
+            }
+            conn.execute(models.ArchivedYear.__table__.insert(), rollup)
+            # Dusre workers ke caches bhi stale ho gaye
+            conn.execute(
+                update(models.CacheVersion.__table__)
+                .where(models.CacheVersion.__table__.c.id == 1)
+                .values(version=models.CacheVersion.__table__.c.version + 1)
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            raw.execute("DETACH DATABASE archive")
+    return rollup
+
+def _years_needed(session, start, end):
+    """Date range jin archived years ko chhoti hai - range na ho toh saare"""
+    return sorted(
+        year for year in archived_years(session)
+        if (not start or start < f"{year + 1}-01-01") and (not end or end >= f"{year}-01-01")
+    )
+
+def iter_archive(year, columns=ARCHIVE_COLUMNS, where="", params=()):
+    """
+    Archive file ke rows stream karta hai - apna read-only connection, isliye
+    kisi bhi transaction ke andar chal jata hai (wahan ATTACH allowed nahi).
+    """
+    conn = sqlite3.connect(f"file:{archive_path(year)}?mode=ro", uri=True)
+    conn.row_factory = sqlite3.Row
+    try:
+        yield from conn.execute(f"SELECT {columns} FROM transactions {where}", params)
+    finally:
+        conn.close()
+
+def _read_archive(year, start, end):
+    clauses, params = [], []
+    if start:
+        clauses.append("date >= ?")
+        params.append(start)
+    if end:
+        clauses.append("date <= ?")
+        params.append(end)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    return [dict(row) for row in iter_archive(year, ARCHIVE_COLUMNS, f"{where} ORDER BY date DESC", params)]
+
+def ledger_rows(session, start=None, end=None):
+    """
+    Hot table + sirf zaroori archive files se rows (date DESC).
+    Range na di ho toh poora ledger - saari archive files bhi.
+    """
+    tx = models.Transaction.__table__
+    query = select(tx).order_by(tx.c.date.desc())
+    if start:
+        query = query.where(tx.c.date >= start)
+    if end:
+        query = query.where(tx.c.date <= end)
+    hot = session.execute(query).mappings().all()
+
+    years = _years_needed(session, start, end)
+    if not years:
+        return hot
+
+    cold = [_read_archive(year, start, end) for year in years]
+    return list(heapq.merge(hot, *cold, key=lambda row: row["date"], reverse=True))
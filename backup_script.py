@@ -5,6 +5,25 @@ from datetime import datetime
 # Rules
 DATABASE_FILE = "future_finance.db"
 BACKUP_DIR = "backups"
+# archive.py wala hi env var
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "archives")
+
+def backup_archives():
+    # Archive files freeze ho chuki hain - same size/mtime wali copy ho toh dobara nahi
+    # (reset ke baad re-archive file dobara likhta hai, tab nayi copy chahiye)
+    if not os.path.isdir(ARCHIVE_DIR):
+        return
+    destination_dir = f"{BACKUP_DIR}/archives"
+    os.makedirs(destination_dir, exist_ok=True)
+    for name in sorted(os.listdir(ARCHIVE_DIR)):
+        source = f"{ARCHIVE_DIR}/{name}"
+        destination = f"{destination_dir}/{name}"
+        if os.path.exists(destination):
+            src, dst = os.stat(source), os.stat(destination)
+            if src.st_size == dst.st_size and src.st_mtime <= dst.st_mtime:
+                continue
+        shutil.copy2(source, destination)
+        print(f"🗄️ Archive copied: {destination}")
 
 def do_backup():
     # Agar folder nahi hai toh banao
@@ -23,5 +42,7 @@ def do_backup():
     else:
         print("❌ Error: future_finance.db nahi mila!")
 
+    backup_archives()
+
 if __name__ == "__main__":
     do_backup()
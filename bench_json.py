@@ -0,0 +1,80 @@
+"""
+⏱️ JSON Benchmark - purana path vs FAST_JSON path
+
+Chalao:  python bench_json.py 50000
+In-memory SQLite (SQLAlchemy, app wali models) mein fake ledger banata hai aur
+dono paths ka time + size print karta hai. Rows usi tarah aate hain jaise
+dev_api mein - select(...).mappings().all() se RowMapping.
+"""
+
+import gzip
+import json
+import random
+import sys
+import time
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import create_engine, insert, select
+
+import models
+from fast_json import FastJSONResponse, brotli, orjson
+
+
+def build_ledger(rows):
+    engine = create_engine("sqlite://")
+    models.Transaction.__table__.create(engine)
+    categories = ["Food & Dining", "Rent", "Transportation", "Entertainment", "Utilities", "Shopping"]
+    with engine.begin() as conn:
+        conn.execute(insert(models.Transaction), [
+            {"description": f"Payment #{i}", "amount": round(random.uniform(-5000, 5000), 2),
+             "date": f"2024-{random.randint(1, 12):02d}-{random.randint(1, 28):02d}",
+             "category": random.choice(categories), "status": "completed", "currency": "INR"}
+            for i in range(rows)
+        ])
+    return engine.connect()
+
+def fetch_rows(conn):
+    """dev_api / archive.ledger_rows wali query - RowMapping list"""
+    tx = models.Transaction.__table__
+    return conn.execute(select(tx).order_by(tx.c.date.desc())).mappings().all()
+
+def timed(label, fn, repeat=5):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    print(f"  {label:<34} {best * 1000:9.2f} ms")
+    return result
+
+def current_path(conn):
+    """FAST_JSON=0: FastAPI RowMapping list ko jsonable_encoder -> json.dumps karta hai"""
+    data = jsonable_encoder(fetch_rows(conn))
+    return json.dumps(data, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+def fast_path(conn):
+    """FAST_JSON=1: RowMapping list seedha orjson mein (respond())"""
+    return FastJSONResponse(None).render(fetch_rows(conn))
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    conn = build_ledger(rows)
+
+    print(f"📊 {rows} transactions (orjson={'yes' if orjson else 'no'}, brotli={'yes' if brotli else 'no'})")
+    print("🐢 Serialisation")
+    payload = timed("current (jsonable_encoder + json)", lambda: current_path(conn))
+    fast_payload = timed("fast (RowMapping + orjson)", lambda: fast_path(conn))
+
+    print("🗜️ Wire size")
+    print(f"  {'raw':<34} {len(payload) / 1024:9.1f} KB")
+    gz = timed("gzip level 6", lambda: gzip.compress(fast_payload, compresslevel=6))
+    print(f"  {'gzip size':<34} {len(gz) / 1024:9.1f} KB")
+    if brotli is not None:
+        br = timed("brotli quality 4", lambda: brotli.compress(fast_payload, quality=4))
+        print(f"  {'brotli size':<34} {len(br) / 1024:9.1f} KB")
+
+    conn.close()
+
+if __name__ == "__main__":
+    main()
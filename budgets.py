@@ -0,0 +1,87 @@
+"""
+🎯 Budgets - per-category monthly budget + threshold alerts
+
+Har write pe sirf us (category, month) ka running total dekha jata hai,
+poora ledger dobara aggregate nahi hota.
+"""
+
+from datetime import datetime
+
+from sqlalchemy import select
+
+import models
+from database import upsert_insert
+
+# Kitne % pe alert banana hai
+BUDGET_THRESHOLDS = (50, 80, 100)
+
+
+def current_month():
+    return datetime.now().strftime("%Y-%m")
+
+def percent_used(spent, monthly_limit):
+    if not monthly_limit:
+        return 0.0
+    return round(spent / monthly_limit * 100, 2)
+
+def evaluate_thresholds(session, category, month, old_spent, new_spent, budget=None):
+    """
+    old_spent -> new_spent jaate waqt jo thresholds cross hue unka alert record karta hai.
+    Ek (category, month, threshold) ka alert ek hi baar banta hai.
+    """
+    if new_spent <= old_spent:
+        return []
+
+    budget = budget or session.get(models.Budget, category)
+    if budget is None or budget.monthly_limit <= 0:
+        return []
+
+    old_pct = old_spent / budget.monthly_limit * 100
+    new_pct = new_spent / budget.monthly_limit * 100
+    crossed = [t for t in BUDGET_THRESHOLDS if old_pct < t <= new_pct]
+    if not crossed:
+        return []
+
+    # ON CONFLICT DO NOTHING - do writers ek saath cross karein toh bhi ek hi alert (no 500)
+    now = datetime.now().isoformat()
+    inserted = session.execute(
+        upsert_insert(models.BudgetAlert)
+        .values([
+            {"category": category, "month": month, "threshold": t,
+             "spent": new_spent, "monthly_limit": budget.monthly_limit, "created_at": now}
+            for t in crossed
+        ])
+        .on_conflict_do_nothing(index_elements=["category", "month", "threshold"])
+        .returning(models.BudgetAlert.threshold)
+    ).scalars().all()
+    return inserted
+
+def budget_status(session, month):
+    """Saare budgets ka status - har budget ke liye ek row, ledger scan nahi"""
+    spent = models.MonthlyCategoryTotal
+    rows = session.execute(
+        select(models.Budget.category, models.Budget.monthly_limit, spent.spent)
+        .outerjoin(spent, (spent.category == models.Budget.category) & (spent.month == month))
+        .order_by(models.Budget.category)
+    ).all()
+
+    alerts = session.execute(
+        select(models.BudgetAlert.category, models.BudgetAlert.threshold, models.BudgetAlert.created_at)
+        .where(models.BudgetAlert.month == month)
+        .order_by(models.BudgetAlert.created_at)
+    ).mappings().all()
+
+    budgets = []
+    for row in rows:
+        used = row.spent or 0
+        pct = percent_used(used, row.monthly_limit)
+        budgets.append({
+            "category": row.category,
+            "monthly_limit": row.monthly_limit,
+            "spent": used,
+            "remaining": round(row.monthly_limit - used, 2),
+            "percent_used": pct,
+            "thresholds_reached": [t for t in BUDGET_THRESHOLDS if pct >= t],
+            "over_budget": used > row.monthly_limit,
+        })
+    return {"month": month, "budgets": budgets, "alerts": alerts}
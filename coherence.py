@@ -0,0 +1,76 @@
+"""
+🔁 Cache coherence - multiple worker processes ke beech
+
+Har write apne transaction mein ek shared version counter badhata hai
+(SQL: cache_version row, Mongo: meta collection ka version doc). Har worker
+last dekha hua version yaad rakhta hai; reads se pehle (throttled) check
+karta hai aur version kisi aur ne badhaya ho toh apne saare in-process
+caches clear kar deta hai. Apne writes ke baad caches already precisely
+invalidate ho chuke hote hain, isliye tab full clear nahi hota.
+"""
+
+import os
+import threading
+import time
+
+CACHE_SYNC_INTERVAL = float(os.getenv("CACHE_SYNC_INTERVAL", "0.5"))
+
+
+class CacheCoherence:
+    """Shared version dekh ke registered caches ko invalidate karta hai"""
+
+    def __init__(self, interval=CACHE_SYNC_INTERVAL):
+        self.interval = interval
+        self._callbacks = []
+        self._seen = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def register(self, callback):
+        """callback() - version badalne pe poora cache clear karna"""
+        self._callbacks.append(callback)
+        return callback
+
+    def _clear_all(self):
+        for callback in self._callbacks:
+            callback()
+
+    def observe(self, version):
+        """Shared version dekha - kisi aur ne badhaya ho toh caches clear"""
+        with self._lock:
+            changed = self._seen is not None and version != self._seen
+            self._seen = version
+            self._checked_at = time.monotonic()
+        if changed:
+            self._clear_all()
+
+    def committed(self, version):
+        """
+        Is worker ka write commit hua (naya version = version).
+        Agar beech mein kisi aur ka write nahi aaya toh caches already sahi hain.
+        """
+        with self._lock:
+            foreign = self._seen is not None and version != self._seen + 1
+            self._seen = version
+            self._checked_at = time.monotonic()
+        if foreign:
+            self._clear_all()
+
+    def due(self):
+        return time.monotonic() - self._checked_at >= self.interval
+
+    # ---- Mongo backend (SQL wala sql_stores.py mein) ----------------------
+
+    def sync_mongo(self, meta_col):
+        if self.due():
+            doc = meta_col.find_one({"_id": "cache_version"}) or {}
+            self.observe(doc.get("version", 0))
+
+    def bump_mongo(self, meta_col):
+        doc = meta_col.find_one_and_update(
+            {"_id": "cache_version"}, {"$inc": {"version": 1}}, upsert=True, return_document=True
+        )
+        self.committed(doc["version"])
+
+
+coherence = CacheCoherence()
@@ -0,0 +1,39 @@
+"""
+🧵 DB Executor - blocking DB kaam event loop se bahar chalane ke liye
+
+Reads ek chhote bounded pool pe chalte hain (parallel), writes alag writer
+pool pe (default 1 thread - SQLite ek time pe ek hi writer allow karta hai).
+Isse ek slow write /health jaise requests ko freeze nahi karta.
+"""
+
+import asyncio
+import contextvars
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+DB_READ_WORKERS = int(os.getenv("DB_READ_WORKERS", "4"))
+# SQLite pe 1 hi rakho; Postgres pe badha sakte ho
+DB_WRITE_WORKERS = int(os.getenv("DB_WRITE_WORKERS", "1"))
+
+_read_pool = ThreadPoolExecutor(max_workers=DB_READ_WORKERS, thread_name_prefix="db-read")
+_write_pool = ThreadPoolExecutor(max_workers=DB_WRITE_WORKERS, thread_name_prefix="db-write")
+
+
+async def run_read(fn, *args, **kwargs):
+    """Read wala kaam reader pool pe chalata hai"""
+    loop = asyncio.get_running_loop()
+    # contextvars (e.g. idempotency key) worker thread tak pahunchein
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(_read_pool, partial(context.run, fn, *args, **kwargs))
+
+async def run_write(fn, *args, **kwargs):
+    """Write wala kaam writer pool pe chalata hai"""
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(_write_pool, partial(context.run, fn, *args, **kwargs))
+
+def shutdown():
+    """App band hote waqt pools saaf karta hai"""
+    _read_pool.shutdown(wait=True)
+    _write_pool.shutdown(wait=True)
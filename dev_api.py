@@ -1,13 +1,36 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Header, Request
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, Field, field_validator
 from typing import Optional, List
 from datetime import datetime, timedelta
-import sqlite3
+from sqlalchemy import bindparam, case, delete, func, insert, inspect, select, text, update
+from sqlalchemy.exc import DBAPIError, IntegrityError
 import json
+import os
+import time
+
+import models
+from database import Base, SessionLocal, engine, upsert_insert
+from archive import ArchiveError, archive_year, check_writable, ledger_rows
+from budgets import budget_status, current_month, evaluate_thresholds
+from coherence import coherence
+from db_executor import run_read, run_write, shutdown as shutdown_db_executor
+from fast_json import install as install_fast_json, respond
+from idempotency import install as install_idempotency
+from fx import BASE_CURRENCY, MissingRateError, convert_from_inr, convert_rows_to_inr, fx_cache, load_rates, load_rates_file
+from insights import get_insights, insights_cache
+from ledger import apply_transactions, rebuild_monthly_totals
+from merchants import rebuild_merchants, record_merchants, top_merchants
+from sketch import MERCHANT_SKETCH_CAPACITY
+from sql_stores import SqlIdempotencyStore, bump_cache_version, sync_cache_version
 
 app = FastAPI(title="FinanceOS API - Dynamic", version="2.0.0")
 
+# Idempotency-Key wale retries stored response paate hain (CORS/compression se pehle lagao)
+idempotency_store = SqlIdempotencyStore(SessionLocal, run_write)
+install_idempotency(app, idempotency_store)
+
 # CORS setup
 app.add_middleware(
     CORSMiddleware,
@@ -17,90 +40,124 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# FAST_JSON=1 pe bade responses compress hote hain
+install_fast_json(app)
+
 # ============================================================================
 # 📦 DATABASE SETUP
 # ============================================================================
 
-DB_NAME = "finance.db"
+# templates/index.html yahi key bhejta hai
+TASKS_API_KEY = os.getenv("TASKS_API_KEY", "bhai_ka_secret_786")
+
+DEFAULT_CATEGORIES = [
+    ("Food & Dining", "#10b981"),
+    ("Rent", "#3b82f6"),
+    ("Transportation", "#f59e0b"),
+    ("Entertainment", "#8b5cf6"),
+    ("Utilities", "#ec4899"),
+    ("Shopping", "#06b6d4"),
+]
+
+def migrate_db():
+    """Purani finance.db ki tables mein naye columns jodta hai"""
+    # Inspect bhi isi connection pe - BEGIN IMMEDIATE ke baad dusra connection lock ka wait karta
+    with engine.begin() as conn:
+        columns = {column["name"] for column in inspect(conn).get_columns("transactions")}
+        if "currency" not in columns:
+            conn.execute(text("ALTER TABLE transactions ADD COLUMN currency VARCHAR NOT NULL DEFAULT 'INR'"))
+        if "original_amount" not in columns:
+            conn.execute(text("ALTER TABLE transactions ADD COLUMN original_amount FLOAT"))
+        # idempotency_keys pehle bina committed column ke bani thi
+        idempotency_columns = {column["name"] for column in inspect(conn).get_columns("idempotency_keys")}
+        if "committed" not in idempotency_columns:
+            conn.execute(text("ALTER TABLE idempotency_keys ADD COLUMN committed BOOLEAN NOT NULL DEFAULT 0"))
+
+def create_schema(attempts=5):
+    """
+    Tables + migrations. WEB_CONCURRENCY > 1 pe saare workers ek saath boot karte hain -
+    kisi aur ne beech mein table/column bana diya ho toh dobara try (checkfirst ab skip karega).
+    """
+    for attempt in range(attempts):
+        try:
+            Base.metadata.create_all(bind=engine)
+            migrate_db()
+            return
+        except DBAPIError as exc:
+            message = str(exc.orig).lower()
+            if attempt == attempts - 1 or not ("already exists" in message or "duplicate column" in message):
+                raise
+            time.sleep(0.1 * (attempt + 1))
 
 def init_db():
-    """Database initialize karta hai - Pehli baar chalane pe"""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    
-    # Transactions table
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS transactions (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            description TEXT NOT NULL,
-            amount REAL NOT NULL,
-            date TEXT NOT NULL,
-            category TEXT NOT NULL,
-            status TEXT DEFAULT 'completed'
-        )
-    """)
-    
-    # Categories table
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS categories (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT UNIQUE NOT NULL,
-            total_spent REAL DEFAULT 0,
-            color TEXT NOT NULL
+    """Database initialize karta hai - Pehli baar chalane pe (kai workers ek saath bhi safe)"""
+    # Saari tables (transactions, categories, summary, tasks) shared engine pe
+    create_schema()
+    
+    with SessionLocal() as session:
+        # Seed rows ON CONFLICT DO NOTHING - dusra worker pehle daal chuka ho toh skip
+        session.execute(
+            upsert_insert(models.Summary)
+            .values(id=1, total_balance=50000.0, monthly_income=0.0, total_expenses=0.0)
+            .on_conflict_do_nothing(index_elements=["id"])
         )
-    """)
-    
-    # Summary table (single row)
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS summary (
-            id INTEGER PRIMARY KEY CHECK (id = 1),
-            total_balance REAL,
-            monthly_income REAL,
-            total_expenses REAL
+        
+        # Shared cache version (multi-worker coherence)
+        session.execute(
+            upsert_insert(models.CacheVersion).values(id=1, version=0).on_conflict_do_nothing(index_elements=["id"])
         )
-    """)
-    
-    # Check if summary exists, if not create it
-    cursor.execute("SELECT COUNT(*) FROM summary")
-    if cursor.fetchone()[0] == 0:
-        cursor.execute("""
-            INSERT INTO summary (id, total_balance, monthly_income, total_expenses)
-            VALUES (1, 50000.0, 0.0, 0.0)
-        """)
-    
-    # Check if categories exist, if not add defaults
-    cursor.execute("SELECT COUNT(*) FROM categories")
-    if cursor.fetchone()[0] == 0:
-        default_categories = [
-            ("Food & Dining", 0, "#10b981"),
-            ("Rent", 0, "#3b82f6"),
-            ("Transportation", 0, "#f59e0b"),
-            ("Entertainment", 0, "#8b5cf6"),
-            ("Utilities", 0, "#ec4899"),
-            ("Shopping", 0, "#06b6d4"),
-        ]
-        cursor.executemany(
-            "INSERT INTO categories (name, total_spent, color) VALUES (?, ?, ?)",
-            default_categories
-        )
-    
-    conn.commit()
-    conn.close()
+        
+        # Check if categories exist, if not add defaults
+        if not session.scalar(select(func.count()).select_from(models.Category)):
+            session.execute(
+                upsert_insert(models.Category)
+                .values([{"name": name, "total_spent": 0, "color": color} for name, color in DEFAULT_CATEGORIES])
+                .on_conflict_do_nothing(index_elements=["name"])
+            )
+        
+        # Purani finance.db (monthly totals se pehle wali) - running totals backfill
+        has_monthly = session.scalar(select(func.count()).select_from(models.MonthlyCategoryTotal))
+        if not has_monthly and session.scalar(select(func.count()).select_from(models.Transaction)):
+            rebuild_monthly_totals(session)
+        
+        # Top merchants sketch bhi - purani db ke transactions pehle se count ho jayein
+        has_merchants = session.scalar(select(func.count()).select_from(models.MerchantCounter))
+        if not has_merchants and session.scalar(select(func.count()).select_from(models.Transaction)):
+            rebuild_merchants(session)
+        
+        # FX_RATES_FILE diya hai toh rates load
+        load_rates_file(session)
+        
+        session.commit()
     print("✅ Database initialized!")
 
 # Initialize database on startup
 init_db()
 
+# Shared version badle (dusre worker ka write) toh ye caches poore clear
+coherence.register(insights_cache.invalidate)
+coherence.register(fx_cache.invalidate)
+
 # ============================================================================
 # 📋 PYDANTIC MODELS (Request/Response schemas)
 # ============================================================================
 
+def parse_day(value):
+    """'YYYY-MM-DD' date (normalised) - galat ya khaali pe ValueError, jo pydantic 422 bana deta hai"""
+    if value is None:
+        return None
+    return datetime.strptime(value, "%Y-%m-%d").strftime("%Y-%m-%d")
+
 class Transaction(BaseModel):
     description: str
-    amount: float
+    amount: float  # currency mein (default INR)
     date: str
     category: str
     status: str = "completed"
+    currency: str = BASE_CURRENCY
+
+    # Archive/monthly rollups date[:4] / date[:7] pe chalte hain
+    _check_date = field_validator("date")(parse_day)
 
 class TransactionUpdate(BaseModel):
     description: Optional[str] = None
@@ -108,11 +165,25 @@ class TransactionUpdate(BaseModel):
     date: Optional[str] = None
     category: Optional[str] = None
     status: Optional[str] = None
+    currency: Optional[str] = None
+
+    _check_date = field_validator("date")(parse_day)
+
+class TransactionBulkUpdate(TransactionUpdate):
+    id: int
 
 class Category(BaseModel):
     name: str
     color: str
 
+class FxRateIn(BaseModel):
+    currency: str
+    day: str
+    rate_to_inr: float = Field(gt=0)
+
+class BudgetSet(BaseModel):
+    monthly_limit: float
+
 class SummaryUpdate(BaseModel):
     total_balance: Optional[float] = None
     monthly_income: Optional[float] = None
@@ -122,92 +193,188 @@ class SummaryUpdate(BaseModel):
 # 🔧 HELPER FUNCTIONS
 # ============================================================================
 
-def get_db_connection():
-    conn = sqlite3.connect(DB_NAME)
-    conn.row_factory = sqlite3.Row
-    return conn
-
-def calculate_category_totals():
-    """Categories ka total calculate karta hai transactions se"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
+TRANSACTION_COLUMNS = models.Transaction.__table__.c
+CATEGORY_COLUMNS = models.Category.__table__.c
+
+def _read_unit(work):
+    """Ek request ke saare read statements ek hi session pe"""
+    with SessionLocal() as session:
+        # SQLite pe deferred BEGIN - reads write lock nahi lete
+        session.connection(execution_options={"sqlite_begin": "DEFERRED"})
+        # Dusre worker ne likha ho toh in-process caches clear
+        sync_cache_version(session)
+        return work(session)
+
+def _write_unit(work):
+    """
+    Ek request ke saare write statements ek hi transaction mein.
+    SQLite pe BEGIN IMMEDIATE (database.py), Postgres pe fetch_transactions
+    FOR UPDATE - purana row padhne se commit tak dusra worker beech mein nahi aata.
+    """
+    with SessionLocal() as session:
+        try:
+            result = work(session)
+            version = bump_cache_version(session)
+            # Idempotency-Key wali request - record ledger change ke saath hi committed mark
+            idempotency_store.mark_committed(session)
+            session.commit()
+            coherence.committed(version)
+            _invalidate_derived(session)
+            return result
+        except Exception:
+            session.rollback()
+            raise
+
+def _invalidate_derived(session):
+    """Commit ke baad sirf touched (category, month) ke derived caches hatao"""
+    if session.info.get("fx_currencies"):
+        fx_cache.invalidate(session.info["fx_currencies"])
+    if session.info.get("rebuilt"):
+        insights_cache.invalidate()
+    elif session.info.get("touched_months"):
+        insights_cache.invalidate(session.info["touched_months"])
+
+async def read_db(work):
+    """work(session) ko reader pool pe chalata hai - event loop block nahi hota"""
+    return await run_read(_read_unit, work)
+
+async def write_db(work):
+    """work(session) ko writer pool pe chalata hai, end mein ek commit"""
+    return await run_write(_write_unit, work)
+
+def calculate_category_totals(session):
+    """Categories ka total monthly totals se (archived years ke frozen months bhi shamil)"""
     # Reset all categories to 0
-    cursor.execute("UPDATE categories SET total_spent = 0")
-    
-    # Calculate totals from transactions (only negative amounts = expenses)
-    cursor.execute("""
-        SELECT category, SUM(ABS(amount)) as total
-        FROM transactions
-        WHERE amount < 0
-        GROUP BY category
-    """)
-    
-    for row in cursor.fetchall():
-        cursor.execute(
-            "UPDATE categories SET total_spent = ? WHERE name = ?",
-            (row['total'], row['category'])
+    session.execute(update(models.Category).values(total_spent=0))
+    
+    # Calculate totals from monthly running totals (only expenses)
+    totals = session.execute(
+        select(models.MonthlyCategoryTotal.category, func.sum(models.MonthlyCategoryTotal.spent).label("total"))
+        .group_by(models.MonthlyCategoryTotal.category)
+    ).all()
+    
+    if totals:
+        # Core executemany - ek cached statement, saari categories ek round mein
+        session.execute(
+            update(models.Category.__table__)
+            .where(CATEGORY_COLUMNS.name == bindparam("category_name"))
+            .values(total_spent=bindparam("category_total")),
+            [{"category_name": row.category, "category_total": row.total} for row in totals]
         )
-    
-    conn.commit()
-    conn.close()
 
-def calculate_summary():
+def calculate_summary(session):
     """Summary automatically calculate karta hai"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    amount = models.Transaction.amount
     
-    # Total expenses (negative amounts)
-    cursor.execute("SELECT SUM(ABS(amount)) FROM transactions WHERE amount < 0")
-    total_expenses = cursor.fetchone()[0] or 0
-    
-    # Total income (positive amounts)
-    cursor.execute("SELECT SUM(amount) FROM transactions WHERE amount > 0")
-    total_income = cursor.fetchone()[0] or 0
+    # Total expenses (negative amounts) aur income (positive amounts) - hot table ka ek scan
+    total_expenses, total_income = session.execute(
+        select(
+            func.sum(case((amount < 0, func.abs(amount)), else_=0)),
+            func.sum(case((amount > 0, amount), else_=0)),
+        )
+    ).one()
     
-    # Get current balance
-    cursor.execute("SELECT total_balance FROM summary WHERE id = 1")
-    current_balance = cursor.fetchone()[0] or 0
+    # Archived years ke frozen rollups
+    archived_income, archived_expenses = session.execute(
+        select(func.sum(models.ArchivedYear.total_income), func.sum(models.ArchivedYear.total_expenses))
+    ).one()
     
     # Update summary
-    cursor.execute("""
-        UPDATE summary 
-        SET total_expenses = ?, monthly_income = ?
-        WHERE id = 1
-    """, (total_expenses, total_income))
-    
-    conn.commit()
-    conn.close()
+    session.execute(
+        update(models.Summary)
+        .where(models.Summary.id == 1)
+        .values(
+            total_expenses=(total_expenses or 0) + (archived_expenses or 0),
+            monthly_income=(total_income or 0) + (archived_income or 0),
+        )
+    )
+
+def recalculate(session):
+    """Saare totals ek hi session/transaction mein (full rebuild)"""
+    rebuild_monthly_totals(session)
+    calculate_category_totals(session)
+    calculate_summary(session)
+    rebuild_merchants(session)
+
+def fetch_transactions(session, ids):
+    """ids ke current rows {id: row} (locked) - running totals se purana amount hatane ke liye"""
+    rows = session.execute(
+        select(models.Transaction.__table__).where(TRANSACTION_COLUMNS.id.in_(ids)).with_for_update()
+    ).mappings().all()
+    return {row["id"]: row for row in rows}
+
+def convert_updates(session, old_rows, rows):
+    """amount/currency/date badle toh INR amount dobara nikalta hai (poora batch ek saath)"""
+    changed = [row for row in rows if {"amount", "currency", "date"} & row.keys()]
+    if not changed:
+        return rows
+    
+    batch = []
+    for row in changed:
+        old = old_rows[row["id"]]
+        old_amount = old["original_amount"] if old["original_amount"] is not None else old["amount"]
+        batch.append({
+            "amount": row.get("amount", old_amount),
+            "currency": row.get("currency", old["currency"] or BASE_CURRENCY),
+            "date": row.get("date", old["date"]),
+        })
+    convert_rows_to_inr(session, batch)
+    
+    for row, converted in zip(changed, batch):
+        row.update(converted)
+    return rows
+
+# Template "access_token" header bhejta hai (underscore ke saath)
+TASKS_TOKEN_HEADER = Header(None, convert_underscores=False)
+
+def check_api_key(access_token):
+    if access_token != TASKS_API_KEY:
+        raise HTTPException(status_code=401, detail="Invalid access token")
+
+def parse_month(month):
+    """'YYYY-MM' query param (default current month) - galat format pe 400"""
+    if month is None:
+        return current_month()
+    try:
+        return datetime.strptime(month, "%Y-%m").strftime("%Y-%m")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="month 'YYYY-MM' format mein hona chahiye")
 
 # ============================================================================
 # 🏠 BASIC ENDPOINTS
 # ============================================================================
 
+@app.exception_handler(MissingRateError)
+@app.exception_handler(ArchiveError)
+async def bad_request_handler(request: Request, exc: ValueError):
+    return JSONResponse(status_code=400, content={"detail": str(exc)})
+
+@app.on_event("shutdown")
+async def shutdown_db_pools():
+    shutdown_db_executor()
+    engine.dispose()
+
 @app.get("/")
 async def root():
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute("SELECT COUNT(*) FROM transactions")
-    tx_count = cursor.fetchone()[0]
+    def work(session):
+        tx_count = session.scalar(select(func.count()).select_from(models.Transaction))
+        cat_count = session.scalar(select(func.count()).select_from(models.Category))
+        return tx_count, cat_count
     
-    cursor.execute("SELECT COUNT(*) FROM categories")
-    cat_count = cursor.fetchone()[0]
-    
-    conn.close()
+    tx_count, cat_count = await read_db(work)
     
     return {
         "message": "🎉 FinanceOS Dynamic Backend",
         "status": "running",
         "version": "2.0.0",
-        "database": "SQLite",
+        "database": engine.dialect.name,
         "transactions": tx_count,
         "categories": cat_count,
         "endpoints": {
-            "GET": "/transactions, /categories, /summary",
-            "POST": "/transactions, /categories",
-            "PUT": "/transactions/{id}, /summary",
-            "DELETE": "/transactions/{id}, /categories/{id}"
+            "GET": "/transactions, /categories, /summary, /budgets/status, /insights, /tasks",
+            "POST": "/transactions, /transactions/bulk, /categories, /fx/rates, /archive/{year}, /tasks",
+            "PUT": "/transactions/{id}, /transactions/bulk, /summary, /budgets/{category}",
+            "DELETE": "/transactions/{id}, /categories/{id}, /tasks/{id}"
         }
     }
 
@@ -222,147 +389,182 @@ async def health():
 @app.get("/transactions")
 async def get_all_transactions():
     """Frontend ke liye complete data return karta hai"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    def work(session):
+        # Get summary
+        summary_row = session.get(models.Summary, 1)
+        
+        # Get categories
+        categories = session.execute(
+            select(CATEGORY_COLUMNS.name, CATEGORY_COLUMNS.total_spent.label("value"), CATEGORY_COLUMNS.color)
+            .where(CATEGORY_COLUMNS.total_spent > 0)
+        ).mappings().all()
+        
+        # Get recent transactions (last 10)
+        transactions = session.execute(
+            select(models.Transaction.__table__)
+            .order_by(TRANSACTION_COLUMNS.date.desc(), TRANSACTION_COLUMNS.id.desc())
+            .limit(10)
+        ).mappings().all()
+        return summary_row, categories, transactions
+    
+    summary_row, categories, transactions = await read_db(work)
     
-    # Get summary
-    cursor.execute("SELECT * FROM summary WHERE id = 1")
-    summary_row = cursor.fetchone()
     summary = {
-        "totalBalance": summary_row['total_balance'],
-        "monthlyIncome": summary_row['monthly_income'],
-        "totalExpenses": summary_row['total_expenses'],
-        "balanceTrend": [42000, 43200, 44100, summary_row['total_balance']],
-        "incomeTrend": [11800, 12100, 12200, summary_row['monthly_income']],
-        "expensesTrend": [8200, 8500, 8800, summary_row['total_expenses']]
+        "totalBalance": summary_row.total_balance,
+        "monthlyIncome": summary_row.monthly_income,
+        "totalExpenses": summary_row.total_expenses,
+        "balanceTrend": [42000, 43200, 44100, summary_row.total_balance],
+        "incomeTrend": [11800, 12100, 12200, summary_row.monthly_income],
+        "expensesTrend": [8200, 8500, 8800, summary_row.total_expenses]
     }
     
-    # Get categories
-    cursor.execute("SELECT name, total_spent as value, color FROM categories WHERE total_spent > 0")
-    categories = [dict(row) for row in cursor.fetchall()]
-    
-    # Get recent transactions (last 10)
-    cursor.execute("""
-        SELECT id, description, amount, date, category, status 
-        FROM transactions 
-        ORDER BY date DESC, id DESC 
-        LIMIT 10
-    """)
-    transactions = [dict(row) for row in cursor.fetchall()]
-    
     # Monthly trends (simplified - last 4 months)
     monthly_trends = [
-        {"month": "Jan", "income": summary_row['monthly_income'] * 0.9, "expenses": summary_row['total_expenses'] * 0.9},
-        {"month": "Feb", "income": summary_row['monthly_income'] * 0.95, "expenses": summary_row['total_expenses'] * 0.95},
-        {"month": "Mar", "income": summary_row['monthly_income'] * 0.98, "expenses": summary_row['total_expenses'] * 0.98},
-        {"month": "Apr", "income": summary_row['monthly_income'], "expenses": summary_row['total_expenses']}
+        {"month": "Jan", "income": summary_row.monthly_income * 0.9, "expenses": summary_row.total_expenses * 0.9},
+        {"month": "Feb", "income": summary_row.monthly_income * 0.95, "expenses": summary_row.total_expenses * 0.95},
+        {"month": "Mar", "income": summary_row.monthly_income * 0.98, "expenses": summary_row.total_expenses * 0.98},
+        {"month": "Apr", "income": summary_row.monthly_income, "expenses": summary_row.total_expenses}
     ]
     
-    conn.close()
-    
-    return {
+    return respond({
         "summary": summary,
         "categorySpending": categories,
         "monthlyTrends": monthly_trends,
         "recentTransactions": transactions
-    }
+    })
 
 @app.post("/transactions")
 async def add_transaction(transaction: Transaction):
     """Naya transaction add karta hai"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute("""
-        INSERT INTO transactions (description, amount, date, category, status)
-        VALUES (?, ?, ?, ?, ?)
-    """, (transaction.description, transaction.amount, transaction.date, 
-          transaction.category, transaction.status))
-    
-    new_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
-    
-    # Recalculate totals
-    calculate_category_totals()
-    calculate_summary()
-    
+    def work(session):
+        check_writable(session, [transaction.date])
+        row = convert_rows_to_inr(session, [transaction.dict()])[0]
+        new_tx = models.Transaction(**row)
+        session.add(new_tx)
+        session.flush()
+        
+        # Running totals + budget alerts + merchant sketch (same transaction)
+        apply_transactions(session, [row])
+        record_merchants(session, [row])
+        return new_tx.id
+    
+    new_id = await write_db(work)
     return {"message": "Transaction added!", "id": new_id}
 
+@app.post("/transactions/bulk")
+async def add_transactions_bulk(transactions: List[Transaction]):
+    """Ek saath bahut saare transactions - ek executemany, ek totals update"""
+    def work(session):
+        if transactions:
+            check_writable(session, [t.date for t in transactions])
+            
+            # Poore batch ka FX conversion ek saath (vectorised)
+            rows = convert_rows_to_inr(session, [t.dict() for t in transactions])
+            session.execute(insert(models.Transaction), rows)
+            apply_transactions(session, rows)
+            record_merchants(session, rows)
+    
+    await write_db(work)
+    return {"message": f"{len(transactions)} transactions added!"}
+
 @app.get("/transactions/list")
-async def get_transaction_list():
-    """Saare transactions ki simple list"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM transactions ORDER BY date DESC")
-    transactions = [dict(row) for row in cursor.fetchall()]
-    conn.close()
-    return transactions
+async def get_transaction_list(currency: Optional[str] = None, start: Optional[str] = None,
+                               end: Optional[str] = None):
+    """
+    Transactions ki simple list (date DESC).
+    Archive files sirf wahi padhi jaati hain jo start/end range maange (range na ho toh saari);
+    currency diya toh converted_amount bhi.
+    """
+    def work(session):
+        rows = ledger_rows(session, start, end)
+        if not currency or currency.upper() == BASE_CURRENCY:
+            return rows
+        
+        # Report currency: poori list ek vectorised conversion mein
+        target = currency.upper()
+        converted = convert_from_inr(
+            session, target, [row["date"] for row in rows], [row["amount"] for row in rows]
+        ).tolist()
+        return [
+            {**row, "converted_amount": amount, "converted_currency": target}
+            for row, amount in zip(rows, converted)
+        ]
+    
+    return respond(await read_db(work))
+
+@app.put("/transactions/bulk")
+async def update_transactions_bulk(transactions: List[TransactionBulkUpdate]):
+    """Bahut saare transactions ek saath update (primary key se bulk UPDATE)"""
+    def work(session):
+        # Ek id do baar aaye toh patches merge (baad wali fields jeetti hain) -
+        # warna dono rows purane values se totals badal deti
+        patches = {}
+        for t in transactions:
+            row = t.dict(exclude_none=True)
+            patches.setdefault(row["id"], {}).update(row)
+        old_rows = fetch_transactions(session, list(patches))
+        missing = sorted(set(patches) - set(old_rows))
+        if missing:
+            raise HTTPException(status_code=404, detail=f"Transactions not found: {missing}")
+
+        rows = [row for row in patches.values() if len(row) > 1]
+        check_writable(session, [row.get("date") for row in rows])
+        if rows:
+            convert_updates(session, old_rows, rows)
+            session.execute(update(models.Transaction), rows)
+            
+            # Purane values totals se hatao, naye jodo
+            new_rows = {row["id"]: {**old_rows[row["id"]], **row} for row in rows}
+            apply_transactions(session, [old_rows[i] for i in new_rows], sign=-1)
+            apply_transactions(session, new_rows.values())
+    
+    await write_db(work)
+    return {"message": f"{len(transactions)} transactions updated!"}
 
 @app.put("/transactions/{transaction_id}")
 async def update_transaction(transaction_id: int, transaction: TransactionUpdate):
     """Existing transaction update karta hai"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    # Check if exists
-    cursor.execute("SELECT * FROM transactions WHERE id = ?", (transaction_id,))
-    if not cursor.fetchone():
-        conn.close()
-        raise HTTPException(status_code=404, detail="Transaction not found")
-    
-    # Build update query
-    updates = []
-    values = []
-    if transaction.description is not None:
-        updates.append("description = ?")
-        values.append(transaction.description)
-    if transaction.amount is not None:
-        updates.append("amount = ?")
-        values.append(transaction.amount)
-    if transaction.date is not None:
-        updates.append("date = ?")
-        values.append(transaction.date)
-    if transaction.category is not None:
-        updates.append("category = ?")
-        values.append(transaction.category)
-    if transaction.status is not None:
-        updates.append("status = ?")
-        values.append(transaction.status)
-    
-    if updates:
-        values.append(transaction_id)
-        query = f"UPDATE transactions SET {', '.join(updates)} WHERE id = ?"
-        cursor.execute(query, values)
-        conn.commit()
-    
-    conn.close()
-    
-    # Recalculate
-    calculate_category_totals()
-    calculate_summary()
-    
+    def work(session):
+        # Check if exists
+        old_row = fetch_transactions(session, [transaction_id]).get(transaction_id)
+        if old_row is None:
+            raise HTTPException(status_code=404, detail="Transaction not found")
+        
+        # Sirf jo fields aaye hain wahi update
+        fields = transaction.dict(exclude_none=True)
+        check_writable(session, [fields.get("date")])
+        if fields:
+            row = convert_updates(session, {transaction_id: old_row}, [{"id": transaction_id, **fields}])[0]
+            fields = {key: value for key, value in row.items() if key != "id"}
+            result = session.execute(
+                update(models.Transaction).where(models.Transaction.id == transaction_id).values(**fields)
+            )
+            if result.rowcount != 1:
+                raise HTTPException(status_code=404, detail="Transaction not found")
+            
+            # Running totals: purana hatao, naya jodo
+            apply_transactions(session, [old_row], sign=-1)
+            apply_transactions(session, [{**old_row, **fields}])
+    
+    await write_db(work)
     return {"message": "Transaction updated!"}
 
 @app.delete("/transactions/{transaction_id}")
 async def delete_transaction(transaction_id: int):
     """Transaction delete karta hai"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute("DELETE FROM transactions WHERE id = ?", (transaction_id,))
-    
-    if cursor.rowcount == 0:
-        conn.close()
-        raise HTTPException(status_code=404, detail="Transaction not found")
-    
-    conn.commit()
-    conn.close()
-    
-    # Recalculate
-    calculate_category_totals()
-    calculate_summary()
-    
+    def work(session):
+        old_row = fetch_transactions(session, [transaction_id]).get(transaction_id)
+        if old_row is None:
+            raise HTTPException(status_code=404, detail="Transaction not found")
+        
+        result = session.execute(delete(models.Transaction).where(models.Transaction.id == transaction_id))
+        if result.rowcount != 1:
+            raise HTTPException(status_code=404, detail="Transaction not found")
+        
+        # Running totals se hatao
+        apply_transactions(session, [old_row], sign=-1)
+    
+    await write_db(work)
     return {"message": "Transaction deleted!"}
 
 # ============================================================================
@@ -372,46 +574,36 @@ async def delete_transaction(transaction_id: int):
 @app.get("/categories")
 async def get_categories():
     """Saari categories list"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM categories")
-    categories = [dict(row) for row in cursor.fetchall()]
-    conn.close()
-    return categories
+    def work(session):
+        return session.execute(select(models.Category.__table__)).mappings().all()
+    
+    return respond(await read_db(work))
 
 @app.post("/categories")
 async def add_category(category: Category):
     """Nayi category add karta hai"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    try:
-        cursor.execute("""
-            INSERT INTO categories (name, color, total_spent)
-            VALUES (?, ?, 0)
-        """, (category.name, category.color))
-        conn.commit()
-        new_id = cursor.lastrowid
-        conn.close()
-        return {"message": "Category added!", "id": new_id}
-    except sqlite3.IntegrityError:
-        conn.close()
-        raise HTTPException(status_code=400, detail="Category already exists")
+    def work(session):
+        new_category = models.Category(name=category.name, color=category.color, total_spent=0)
+        session.add(new_category)
+        try:
+            session.flush()
+        except IntegrityError:
+            raise HTTPException(status_code=400, detail="Category already exists")
+        return new_category.id
+    
+    new_id = await write_db(work)
+    return {"message": "Category added!", "id": new_id}
 
 @app.delete("/categories/{category_id}")
 async def delete_category(category_id: int):
     """Category delete karta hai"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute("DELETE FROM categories WHERE id = ?", (category_id,))
-    
-    if cursor.rowcount == 0:
-        conn.close()
-        raise HTTPException(status_code=404, detail="Category not found")
+    def work(session):
+        result = session.execute(delete(models.Category).where(models.Category.id == category_id))
+        
+        if result.rowcount == 0:
+            raise HTTPException(status_code=404, detail="Category not found")
     
-    conn.commit()
-    conn.close()
+    await write_db(work)
     return {"message": "Category deleted!"}
 
 # ============================================================================
@@ -421,40 +613,182 @@ async def delete_category(category_id: int):
 @app.get("/summary")
 async def get_summary():
     """Current summary"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM summary WHERE id = 1")
-    summary = dict(cursor.fetchone())
-    conn.close()
-    return summary
+    def work(session):
+        return session.execute(
+            select(models.Summary.__table__).where(models.Summary.__table__.c.id == 1)
+        ).mappings().one()
+    
+    return await read_db(work)
 
 @app.put("/summary")
 async def update_summary(summary: SummaryUpdate):
     """Summary manually update karta hai"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    updates = []
-    values = []
-    if summary.total_balance is not None:
-        updates.append("total_balance = ?")
-        values.append(summary.total_balance)
-    if summary.monthly_income is not None:
-        updates.append("monthly_income = ?")
-        values.append(summary.monthly_income)
-    if summary.total_expenses is not None:
-        updates.append("total_expenses = ?")
-        values.append(summary.total_expenses)
-    
-    if updates:
-        values.append(1)  # id = 1
-        query = f"UPDATE summary SET {', '.join(updates)} WHERE id = ?"
-        cursor.execute(query, values)
-        conn.commit()
-    
-    conn.close()
+    def work(session):
+        fields = summary.dict(exclude_none=True)
+        if fields:
+            session.execute(update(models.Summary).where(models.Summary.id == 1).values(**fields))
+    
+    await write_db(work)
     return {"message": "Summary updated!"}
 
+# ============================================================================
+# 💱 FX ENDPOINTS
+# ============================================================================
+
+@app.get("/fx/rates")
+async def get_fx_rates(currency: Optional[str] = None):
+    """Stored FX rates (currency diya toh sirf uske)"""
+    def work(session):
+        query = select(models.FxRate.__table__).order_by(models.FxRate.currency, models.FxRate.day)
+        if currency:
+            query = query.where(models.FxRate.__table__.c.currency == currency.upper())
+        return session.execute(query).mappings().all()
+    
+    return respond(await read_db(work))
+
+@app.post("/fx/rates")
+async def add_fx_rates(rates: List[FxRateIn]):
+    """Per-day FX rates load/update karta hai (1 unit = kitne INR)"""
+    count = await write_db(lambda session: load_rates(session, [r.dict() for r in rates]))
+    return {"message": f"{count} FX rates loaded!"}
+
+# ============================================================================
+# 🗄️ ARCHIVE ENDPOINTS
+# ============================================================================
+
+@app.get("/archive")
+async def get_archived_years():
+    """Archived years + unke frozen rollups"""
+    def work(session):
+        return session.execute(
+            select(models.ArchivedYear.__table__).order_by(models.ArchivedYear.year)
+        ).mappings().all()
+    
+    return await read_db(work)
+
+@app.post("/archive/{year}")
+async def archive_closed_year(year: int):
+    """Closed year ke transactions archive file mein move karta hai"""
+    rollup = await run_write(archive_year, year)
+    insights_cache.invalidate()
+    return {"message": f"{year} archived!", **rollup}
+
+# ============================================================================
+# 🎯 BUDGET ENDPOINTS
+# ============================================================================
+
+@app.get("/budgets")
+async def get_budgets():
+    """Saare category budgets"""
+    def work(session):
+        return session.execute(select(models.Budget.__table__)).mappings().all()
+    
+    return await read_db(work)
+
+@app.put("/budgets/{category}")
+async def set_budget(category: str, budget: BudgetSet):
+    """Category ka monthly budget set/update karta hai"""
+    if budget.monthly_limit <= 0:
+        raise HTTPException(status_code=400, detail="monthly_limit positive hona chahiye")
+    
+    def work(session):
+        row = session.get(models.Budget, category)
+        if row is None:
+            row = models.Budget(category=category, monthly_limit=budget.monthly_limit)
+            session.add(row)
+        else:
+            row.monthly_limit = budget.monthly_limit
+        
+        # Is mahine ka kharcha pehle se threshold ke upar ho toh abhi alert
+        month = current_month()
+        total = session.get(models.MonthlyCategoryTotal, (category, month))
+        evaluate_thresholds(session, category, month, 0.0, total.spent if total else 0.0, budget=row)
+    
+    await write_db(work)
+    return {"message": "Budget set!", "category": category, "monthly_limit": budget.monthly_limit}
+
+@app.delete("/budgets/{category}")
+async def delete_budget(category: str):
+    """Category ka budget hatata hai"""
+    def work(session):
+        result = session.execute(delete(models.Budget).where(models.Budget.category == category))
+        if result.rowcount == 0:
+            raise HTTPException(status_code=404, detail="Budget not found")
+    
+    await write_db(work)
+    return {"message": "Budget deleted!"}
+
+@app.get("/budgets/status")
+async def get_budget_status(month: Optional[str] = None):
+    """Budgets vs running totals + alerts (month = 'YYYY-MM', default current)"""
+    month = parse_month(month)
+    return await read_db(lambda session: budget_status(session, month))
+
+# ============================================================================
+# 🔮 INSIGHTS ENDPOINTS
+# ============================================================================
+
+@app.get("/insights")
+async def get_spending_insights(month: Optional[str] = None):
+    """Category forecasts + anomalous transactions (month = 'YYYY-MM', default current)"""
+    month = parse_month(month)
+    return respond(await read_db(lambda session: get_insights(session, month)))
+
+@app.get("/insights/top-merchants")
+async def get_top_merchants(k: int = 10):
+    """Sabse zyada baar aaye merchants (normalised descriptions) - Space-Saving sketch se"""
+    if not 1 <= k <= MERCHANT_SKETCH_CAPACITY:
+        raise HTTPException(status_code=400, detail=f"k 1 se {MERCHANT_SKETCH_CAPACITY} ke beech hona chahiye")
+    return await read_db(lambda session: top_merchants(session, k))
+
+@app.post("/insights/top-merchants/rebuild")
+async def rebuild_top_merchants():
+    """Sketch ko poore ledger (archives bhi) se dobara banata hai"""
+    tracked = await write_db(rebuild_merchants)
+    return {"message": "Top merchants rebuilt!", "tracked": tracked}
+
+# ============================================================================
+# ✅ TASKS ENDPOINTS (templates/index.html ke liye)
+# ============================================================================
+
+@app.get("/tasks")
+async def get_tasks(access_token: Optional[str] = TASKS_TOKEN_HEADER):
+    """Saare tasks"""
+    check_api_key(access_token)
+    
+    def work(session):
+        return session.execute(select(models.Task.__table__).order_by(models.Task.id)).mappings().all()
+    
+    return await read_db(work)
+
+@app.post("/tasks")
+async def add_task(id: int, title: str, description: Optional[str] = None,
+                   access_token: Optional[str] = TASKS_TOKEN_HEADER):
+    """Naya task add karta hai"""
+    check_api_key(access_token)
+    
+    def work(session):
+        try:
+            session.execute(insert(models.Task).values(id=id, title=title, description=description))
+        except IntegrityError:
+            raise HTTPException(status_code=400, detail="Task already exists")
+    
+    await write_db(work)
+    return {"message": "Task added!", "id": id}
+
+@app.delete("/tasks/{task_id}")
+async def delete_task(task_id: int, access_token: Optional[str] = TASKS_TOKEN_HEADER):
+    """Task delete karta hai"""
+    check_api_key(access_token)
+    
+    def work(session):
+        result = session.execute(delete(models.Task).where(models.Task.id == task_id))
+        if result.rowcount == 0:
+            raise HTTPException(status_code=404, detail="Task not found")
+    
+    await write_db(work)
+    return {"message": "Task deleted!"}
+
 # ============================================================================
 # 🔄 UTILITY ENDPOINTS
 # ============================================================================
@@ -462,25 +796,31 @@ async def update_summary(summary: SummaryUpdate):
 @app.post("/recalculate")
 async def recalculate_all():
     """Sab kuch recalculate karta hai"""
-    calculate_category_totals()
-    calculate_summary()
+    await write_db(recalculate)
     return {"message": "All totals recalculated!"}
 
 @app.delete("/reset")
 async def reset_database():
     """⚠️ DATABASE RESET - Sab data delete ho jayega!"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute("DELETE FROM transactions")
-    cursor.execute("DELETE FROM categories")
-    cursor.execute("UPDATE summary SET total_balance = 50000, monthly_income = 0, total_expenses = 0 WHERE id = 1")
+    def work(session):
+        session.execute(delete(models.Transaction))
+        session.execute(delete(models.Category))
+        session.execute(delete(models.MonthlyCategoryTotal))
+        session.execute(delete(models.Budget))
+        session.execute(delete(models.BudgetAlert))
+        session.execute(delete(models.ArchivedYear))
+        session.execute(delete(models.MerchantCounter))
+        session.info["rebuilt"] = True
+        session.execute(
+            update(models.Summary)
+            .where(models.Summary.id == 1)
+            .values(total_balance=50000, monthly_income=0, total_expenses=0)
+        )
     
-    conn.commit()
-    conn.close()
+    await write_db(work)
     
-    # Reinitialize with defaults
-    init_db()
+    # Reinitialize with defaults (writer pool pe, taaki dusre writes se na takraye)
+    await run_write(init_db)
     
     return {"message": "⚠️ Database reset complete!"}
 
@@ -490,7 +830,7 @@ if __name__ == "__main__":
     print("=" * 70)
     print("🚀 FinanceOS Dynamic Backend Starting...")
     print("=" * 70)
-    print("💾 Database: SQLite (finance.db)")
+    print(f"💾 Database: {engine.url.render_as_string(hide_password=True)}")
     print("📊 Features: Full CRUD operations")
     print("=" * 70)
     print("🌐 API: http://127.0.0.1:8000")
@@ -503,4 +843,9 @@ if __name__ == "__main__":
     print("   POST /categories         - Add new category")
     print("   PUT /summary             - Update balance/income")
     print("=" * 70)
-    uvicorn.run(app, host="127.0.0.1", port=8000, reload=True)
+    # WEB_CONCURRENCY > 1: multi-process mode (caches shared version se sync rehte hain)
+    workers = int(os.getenv("WEB_CONCURRENCY", "1"))
+    if workers > 1:
+        uvicorn.run("dev_api:app", host="127.0.0.1", port=8000, workers=workers)
+    else:
+        uvicorn.run(app, host="127.0.0.1", port=8000, reload=True)
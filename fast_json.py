@@ -0,0 +1,156 @@
+"""
+⚡ Fast JSON + Compression (Opt-in)
+
+FAST_JSON=1 set karo toh:
+  - orjson se serialisation hota hai (FastAPI ka jsonable_encoder skip)
+  - COMPRESS_MIN_BYTES se bade responses gzip/brotli mein jaate hain
+
+FAST_JSON=0 (default) pe purana path hi chalta hai.
+"""
+
+import gzip
+import os
+from collections.abc import Mapping
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # orjson optional hai, na ho toh normal json
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # brotli optional hai, na ho toh sirf gzip
+    brotli = None
+
+
+FAST_JSON_ENABLED = os.getenv("FAST_JSON", "0") == "1"
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+
+# ============================================================================
+# 🧱 ROW HELPERS
+# ============================================================================
+
+def _default(obj):
+    """orjson ko jo types nahi aate unko yahan handle karte hain"""
+    # SQLAlchemy RowMapping dict nahi hai aur orjson sirf exact dict leta hai.
+    # Ye dict() C level ka shallow copy hai - jsonable_encoder ke per-field walk
+    # ke muqable sasta (bench_json.py isi RowMapping path ko measure karta hai)
+    if isinstance(obj, Mapping):
+        return dict(obj)
+    # bson.ObjectId - import kiye bina check (Mongo optional hai)
+    if type(obj).__name__ == "ObjectId":
+        return str(obj)
+    raise TypeError(f"Type {type(obj).__name__} JSON serializable nahi hai")
+
+# ============================================================================
+# 📤 RESPONSE CLASS
+# ============================================================================
+
+class FastJSONResponse(JSONResponse):
+    """orjson wala JSONResponse - SQLAlchemy rows aur Mongo docs seedha serialise"""
+
+    def render(self, content) -> bytes:
+        if orjson is None:
+            return super().render(content)
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+def respond(content):
+    """Heavy endpoints ke liye - fast path on ho toh FastJSONResponse, warna as-is"""
+    if FAST_JSON_ENABLED:
+        return FastJSONResponse(content)
+    return content
+
+# ============================================================================
+# 🗜️ COMPRESSION MIDDLEWARE
+# ============================================================================
+
+def _quality(params):
+    """';q=0.5' jaise params se q-value (default 1, galat q = 0 yaani mana)"""
+    for param in params:
+        name, _, value = param.partition("=")
+        if name.strip().lower() == "q":
+            try:
+                return float(value.strip())
+            except ValueError:
+                return 0.0
+    return 1.0
+
+def _pick_encoding(accept_encoding):
+    """Client ke Accept-Encoding se best encoding chunta hai (br > gzip), q=0 wale nahi"""
+    accepted = set()
+    for part in accept_encoding.split(","):
+        coding, *params = part.split(";")
+        coding = coding.strip().lower()
+        if coding and _quality(params) > 0:
+            accepted.add(coding)
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+class CompressionMiddleware:
+    """
+    ASGI middleware - threshold se bade responses ko br/gzip karta hai.
+    Chhote responses ko waise hi jaane deta hai (compress karna mehenga padta hai).
+    """
+
+    def __init__(self, app, minimum_size=COMPRESS_MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        encoding = _pick_encoding(headers.get(b"accept-encoding", b"").decode("latin-1"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        body = []
+
+        async def buffered_send(message):
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+
+            payload = b"".join(body)
+            response_headers = [
+                (k, v) for k, v in start_message.get("headers", [])
+                if k.lower() != b"content-length"
+            ]
+            already_encoded = any(k.lower() == b"content-encoding" for k, _ in response_headers)
+
+            if len(payload) >= self.minimum_size and not already_encoded:
+                if encoding == "br":
+                    payload = brotli.compress(payload, quality=4)
+                else:
+                    payload = gzip.compress(payload, compresslevel=6)
+                response_headers.append((b"content-encoding", encoding.encode()))
+                response_headers.append((b"vary", b"Accept-Encoding"))
+
+            response_headers.append((b"content-length", str(len(payload)).encode()))
+            await send({**start_message, "headers": response_headers})
+            await send({"type": "http.response.body", "body": payload})
+
+        await self.app(scope, receive, buffered_send)
+
+def install(app):
+    """FAST_JSON on ho toh app pe compression middleware lagata hai"""
+    if FAST_JSON_ENABLED:
+        app.add_middleware(CompressionMiddleware, minimum_size=COMPRESS_MIN_BYTES)
+    return app
@@ -0,0 +1,137 @@
+"""
+💱 FX - foreign currency ko INR mein convert karna
+
+Rates local table (fx_rates) mein per-day store hote hain aur memory cache
+mein (currency, day) key se rakhe jaate hain. Batch conversion NumPy se
+hota hai - har unique (currency, day) ka rate ek hi baar dhoonda jata hai,
+row by row lookup nahi.
+"""
+
+import csv
+import os
+
+import numpy as np
+from sqlalchemy import select
+
+import models
+from database import upsert_insert
+from rate_cache import BASE_CURRENCY, FxCache, MissingRateError
+
+FX_RATES_FILE = os.getenv("FX_RATES_FILE")
+
+fx_cache = FxCache()
+
+
+def _resolve_rates(session, keys):
+    """
+    Missing (currency, day) keys ke rates DB se nikalta hai.
+    Har currency ke liye ek query + np.searchsorted: exact day na ho toh
+    us din se pehle ka latest rate.
+    """
+    by_currency = {}
+    for currency, day in keys:
+        by_currency.setdefault(currency, []).append(day)
+
+    resolved = {}
+    for currency, days in by_currency.items():
+        history = session.execute(
+            select(models.FxRate.day, models.FxRate.rate_to_inr)
+            .where(models.FxRate.currency == currency, models.FxRate.day <= max(days))
+            .order_by(models.FxRate.day)
+        ).all()
+        if not history:
+            raise MissingRateError(f"{currency} ka koi FX rate nahi mila")
+
+        rate_days = np.array([row.day for row in history])
+        rate_values = np.array([row.rate_to_inr for row in history], dtype=float)
+        wanted = np.array(days)
+        idx = np.searchsorted(rate_days, wanted, side="right") - 1
+        if (idx < 0).any():
+            first_missing = min(wanted[idx < 0].tolist())
+            raise MissingRateError(f"{currency} ka {first_missing} ya usse pehle ka FX rate nahi mila")
+        resolved.update(zip(((currency, day) for day in days), rate_values[idx].tolist()))
+    return resolved
+
+def rates_for(session, currencies, days):
+    """
+    currencies/days arrays ke liye rate_to_inr ka NumPy array.
+    Unique (currency, day) pairs hi cache/DB se dekhe jaate hain.
+    """
+    currencies = np.asarray(currencies, dtype=object)
+    days = np.asarray([day[:10] for day in days], dtype=object)
+    rates = np.ones(len(currencies), dtype=float)
+
+    foreign = currencies != BASE_CURRENCY
+    if not foreign.any():
+        return rates
+
+    pairs = np.char.add(currencies[foreign].astype(str), np.char.add("|", days[foreign].astype(str)))
+    unique_pairs, inverse = np.unique(pairs, return_inverse=True)
+    keys = [tuple(pair.split("|", 1)) for pair in unique_pairs.tolist()]
+
+    epoch = fx_cache.epoch
+    known = fx_cache.get_many(keys)
+    missing = [key for key in keys if key not in known]
+    if missing:
+        fetched = _resolve_rates(session, missing)
+        fx_cache.put_many(fetched, epoch)
+        known.update(fetched)
+
+    unique_rates = np.array([known[key] for key in keys], dtype=float)
+    rates[foreign] = unique_rates[inverse]
+    return rates
+
+def convert_rows_to_inr(session, rows):
+    """
+    Transaction dicts ko in-place INR mein convert karta hai.
+    Input 'amount' original currency mein hai; output mein 'amount' INR,
+    'original_amount' + 'currency' original wale.
+    """
+    if not rows:
+        return rows
+    currencies = [(row.get("currency") or BASE_CURRENCY).upper() for row in rows]
+    original = np.array([row["amount"] for row in rows], dtype=float)
+    inr = np.round(original * rates_for(session, currencies, [row["date"] for row in rows]), 2)
+    for row, currency, orig, converted in zip(rows, currencies, original.tolist(), inr.tolist()):
+        row["currency"] = currency
+        row["original_amount"] = orig
+        row["amount"] = converted
+    return rows
+
+def convert_from_inr(session, currency, days, amounts_inr):
+    """Report ke liye INR amounts ko kisi aur currency mein (us din ke rate se)"""
+    amounts = np.asarray(amounts_inr, dtype=float)
+    if currency == BASE_CURRENCY:
+        return amounts
+    rates = rates_for(session, [currency] * len(amounts), days)
+    return np.round(amounts / rates, 2)
+
+def load_rates(session, rates):
+    """
+    rates = [{'currency', 'day', 'rate_to_inr'}] - upsert.
+    Cache commit ke baad invalidate hota hai (session.info["fx_currencies"]).
+    """
+    # Same (currency, day) do baar ho toh last wala
+    unique = {
+        (rate["currency"].upper(), rate["day"][:10]): float(rate["rate_to_inr"]) for rate in rates
+    }
+    # Zero/negative rate pe convert_from_inr divide by zero karta
+    bad = sorted(f"{currency} {day}" for (currency, day), value in unique.items() if not value > 0)
+    if bad:
+        raise ValueError(f"rate_to_inr positive hona chahiye: {', '.join(bad[:5])}")
+    values = [{"currency": currency, "day": day, "rate_to_inr": value} for (currency, day), value in unique.items()]
+    # Upsert - kai workers ek saath FX_RATES_FILE load karein toh bhi conflict nahi
+    for start in range(0, len(values), 500):
+        stmt = upsert_insert(models.FxRate).values(values[start:start + 500])
+        session.execute(stmt.on_conflict_do_update(
+            index_elements=["currency", "day"], set_={"rate_to_inr": stmt.excluded.rate_to_inr}
+        ))
+    session.info.setdefault("fx_currencies", set()).update(rate["currency"].upper() for rate in rates)
+    return len(rates)
+
+def load_rates_file(session, path=FX_RATES_FILE):
+    """CSV (currency,day,rate_to_inr) se rates load karta hai"""
+    if not path or not os.path.exists(path):
+        return 0
+    with open(path, newline="") as f:
+        return load_rates(session, list(csv.DictReader(f)))
@@ -0,0 +1,316 @@
+"""
+🔑 Idempotency-Key - retry-safe writes
+
+Client mutating request (POST/PUT/PATCH/DELETE) ke saath `Idempotency-Key`
+header bheje toh pehli baar ka 2xx response (status + headers + body) store
+ho jata hai. Usi key se retry aaye toh handler dobara nahi chalta - stored
+response hi replay hota hai (ledger/recompute kuch nahi chhuta).
+
+- Store bounded hai: records IDEMPOTENCY_TTL ke baad expire (SQL: indexed
+  table + purge + max rows, Mongo: TTL collection), aage in-process LRU.
+- Key pehle "in progress" placeholder ke saath claim hoti hai - beech mein
+  aaya retry 409 paata hai. Handler crash/timeout ho jaye toh placeholder
+  sirf tab dobara claim hota hai (IDEMPOTENCY_LOCK_TIMEOUT ke baad) jab pakka
+  ho ki ledger write commit nahi hua: SQL pe write transaction khud record ko
+  committed mark karta hai (mark_committed). Mongo pe transaction nahi hai,
+  isliye handler ledger write SE PEHLE mark karta hai - atka hua marked
+  placeholder TTL tak 409 deta hai, duplicate write kabhi nahi.
+- Same key dusri request (method/path/body alag) ke saath = 422.
+- Non-2xx response store nahi hota - client wahi key ke saath retry kar sake.
+"""
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+from datetime import datetime, timedelta, timezone
+
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+
+IDEMPOTENCY_TTL = int(os.getenv("IDEMPOTENCY_TTL", str(24 * 3600)))
+IDEMPOTENCY_LOCK_TIMEOUT = int(os.getenv("IDEMPOTENCY_LOCK_TIMEOUT", "60"))
+IDEMPOTENCY_LRU_SIZE = int(os.getenv("IDEMPOTENCY_LRU_SIZE", "1024"))
+IDEMPOTENCY_MAX_RECORDS = int(os.getenv("IDEMPOTENCY_MAX_RECORDS", "100000"))
+IDEMPOTENCY_PURGE_EVERY = 100  # itne claims pe ek baar expired rows saaf
+
+MUTATING_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+MAX_KEY_LENGTH = 255
+# Ye headers replay pe dobara bante hain
+_SKIP_HEADERS = {"content-length", "content-encoding", "vary"}
+
+# Abhi chal rahi request ki claimed key - write transaction isse record mark karta hai
+current_key = ContextVar("idempotency_key", default=None)
+
+
+def _fingerprint(method, path, query, body):
+    digest = hashlib.sha256()
+    digest.update(f"{method} {path}?{query}\n".encode("latin-1"))
+    digest.update(body)
+    return digest.hexdigest()
+
+def reclaimable(record, now):
+    """
+    Expire ho chuka record, ya atka hua placeholder jiska handler pakka
+    commit nahi hua. Commit ho chuka (response khoya) placeholder TTL tak 409.
+    """
+    if record["expires_at"] <= now:
+        return True
+    return (
+        record["status_code"] is None
+        and not record["committed"]
+        and record["created_at"] + IDEMPOTENCY_LOCK_TIMEOUT <= now
+    )
+
+
+class RecentResponses:
+    """Completed records ka chhota LRU - retries ke liye DB tak jaana nahi padta"""
+
+    def __init__(self, size=IDEMPOTENCY_LRU_SIZE):
+        self.size = size
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            record = self._items.get(key)
+            if record is None:
+                return None
+            if record["expires_at"] <= time.time():
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return record
+
+    def put(self, key, record):
+        with self._lock:
+            self._items[key] = record
+            self._items.move_to_end(key)
+            while len(self._items) > self.size:
+                self._items.popitem(last=False)
+
+# ============================================================================
+# 🗃️ MONGO STORE (SQL store: sql_stores.py, sirf dev_api)
+# ============================================================================
+
+class MongoIdempotencyStore:
+    """
+    idempotency_keys collection - _id = key (unique), expires_at pe TTL index
+    (Mongo khud expired docs hata deta hai). Handler ke writes ke saath
+    transaction nahi hai, isliye handler ledger write se pehle mark_committed
+    bulata hai ("write shuru ho gaya, shayad hua"). Marked placeholder na
+    release hota hai na reclaim - TTL tak 409.
+    """
+
+    def __init__(self, get_collection, ttl=IDEMPOTENCY_TTL):
+        self.get_collection = get_collection
+        self.ttl = ttl
+        self._indexed = False
+
+    async def run(self, fn, *args):
+        return await run_in_threadpool(fn, *args)
+
+    def _collection(self):
+        col = self.get_collection()
+        if not self._indexed:
+            col.create_index("expires_at", expireAfterSeconds=0)
+            self._indexed = True
+        return col
+
+    @staticmethod
+    def _as_record(doc):
+        def epoch(value):
+            # pymongo naive UTC datetime deta hai
+            return value.replace(tzinfo=timezone.utc).timestamp()
+        return {
+            "fingerprint": doc["fingerprint"],
+            "status_code": doc.get("status_code"),
+            "committed": bool(doc.get("committed")),
+            "headers": doc.get("headers") or [],
+            "body": doc.get("body"),
+            "created_at": epoch(doc["created_at"]),
+            "expires_at": epoch(doc["expires_at"]),
+        }
+
+    def claim(self, key, fingerprint):
+        from pymongo.errors import DuplicateKeyError
+        col = self._collection()
+        now = datetime.now(timezone.utc)
+        fresh = {"fingerprint": fingerprint, "status_code": None, "committed": False, "headers": None,
+                 "body": None, "created_at": now, "expires_at": now + timedelta(seconds=self.ttl)}
+        try:
+            col.insert_one({"_id": key, **fresh})
+            return None
+        except DuplicateKeyError:
+            existing = col.find_one({"_id": key})
+
+        if existing is None:
+            # Beech mein TTL ne hata diya
+            return self.claim(key, fingerprint)
+        record = self._as_record(existing)
+        if not reclaimable(record, now.timestamp()):
+            return record
+        result = col.update_one({"_id": key, "created_at": existing["created_at"]}, {"$set": fresh})
+        if result.modified_count:
+            return None
+        return self.get(key)
+
+    def get(self, key):
+        doc = self._collection().find_one({"_id": key})
+        return self._as_record(doc) if doc is not None else None
+
+    def mark_committed(self):
+        """Handler ledger write se pehle bulata hai - request ki claimed key marked"""
+        key = current_key.get()
+        if key is not None:
+            self._collection().update_one({"_id": key}, {"$set": {"committed": True}})
+
+    def complete(self, key, status_code, headers, body):
+        self._collection().update_one(
+            {"_id": key}, {"$set": {"status_code": status_code, "headers": headers, "body": body}}
+        )
+
+    def release(self, key):
+        # Marked placeholder nahi hatta - write ho chuka ho sakta hai
+        self._collection().delete_one({"_id": key, "status_code": None, "committed": {"$ne": True}})
+
+# ============================================================================
+# 🧩 MIDDLEWARE
+# ============================================================================
+
+async def _read_body(receive):
+    """Poori request body padh ke ek naya receive deta hai jo wahi body dobara de"""
+    chunks = []
+    more_body = True
+    while more_body:
+        message = await receive()
+        if message["type"] != "http.request":
+            break
+        chunks.append(message.get("body", b""))
+        more_body = message.get("more_body", False)
+    body = b"".join(chunks)
+    replayed = False
+
+    async def replay_receive():
+        nonlocal replayed
+        if not replayed:
+            replayed = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        return await receive()
+
+    return body, replay_receive
+
+class IdempotencyMiddleware:
+    """
+    ASGI middleware - Idempotency-Key wali mutating requests ka response
+    store/replay karta hai. CORS/compression isse bahar rehne chahiye taaki
+    replay pe bhi wo apna kaam karein (isliye install() sabse pehle).
+    """
+
+    def __init__(self, app, store, lru_size=IDEMPOTENCY_LRU_SIZE):
+        self.app = app
+        self.store = store
+        self.recent = RecentResponses(lru_size)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in MUTATING_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        key = headers.get(b"idempotency-key", b"").decode("latin-1").strip()
+        if not key:
+            await self.app(scope, receive, send)
+            return
+        if len(key) > MAX_KEY_LENGTH:
+            await self._error(scope, receive, send, 400, f"Idempotency-Key {MAX_KEY_LENGTH} characters se lambi nahi ho sakti")
+            return
+
+        body, receive = await _read_body(receive)
+        fingerprint = _fingerprint(scope["method"], scope["path"], scope.get("query_string", b"").decode("latin-1"), body)
+
+        record = self.recent.get(key)
+        if record is None:
+            record = await self.store.run(self.store.claim, key, fingerprint)
+            if record is None:
+                await self._execute(key, fingerprint, scope, receive, send)
+                return
+            if record["status_code"] is not None:
+                self.recent.put(key, record)
+
+        if record["fingerprint"] != fingerprint:
+            await self._error(scope, receive, send, 422, "Ye Idempotency-Key kisi dusri request ke saath use ho chuki hai")
+        elif record["status_code"] is None:
+            await self._error(scope, receive, send, 409, "Isi Idempotency-Key wali request abhi chal rahi hai - thodi der baad retry karo")
+        else:
+            await self._replay(record, send)
+
+    async def _execute(self, key, fingerprint, scope, receive, send):
+        """Handler chalao; 2xx response store karke bhejo, warna key release"""
+        start_message = None
+        chunks = []
+        token = current_key.set(key)
+
+        async def capture_send(message):
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+            chunks.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+
+            status_code = start_message["status"]
+            payload = b"".join(chunks)
+            if 200 <= status_code < 300:
+                stored_headers = [
+                    [k.decode("latin-1"), v.decode("latin-1")]
+                    for k, v in start_message.get("headers", [])
+                    if k.decode("latin-1").lower() not in _SKIP_HEADERS
+                ]
+                await self.store.run(self.store.complete, key, status_code, stored_headers, payload)
+                now = time.time()
+                self.recent.put(key, {
+                    "fingerprint": fingerprint,
+                    "status_code": status_code,
+                    "headers": stored_headers,
+                    "body": payload,
+                    "created_at": now,
+                    "expires_at": now + self.store.ttl,
+                })
+            else:
+                await self.store.run(self.store.release, key)
+            await send(start_message)
+            await send({"type": "http.response.body", "body": payload})
+
+        try:
+            await self.app(scope, receive, capture_send)
+        except Exception:
+            if start_message is None:
+                await self.store.run(self.store.release, key)
+            raise
+        finally:
+            current_key.reset(token)
+
+    async def _replay(self, record, send):
+        headers = [(k.encode("latin-1"), v.encode("latin-1")) for k, v in record["headers"]]
+        headers.append((b"content-length", str(len(record["body"])).encode()))
+        headers.append((b"idempotent-replayed", b"true"))
+        await send({"type": "http.response.start", "status": record["status_code"], "headers": headers})
+        await send({"type": "http.response.body", "body": record["body"]})
+
+    async def _error(self, scope, receive, send, status_code, detail):
+        await JSONResponse(status_code=status_code, content={"detail": detail})(scope, receive, send)
+
+def install(app, store):
+    """
+    Idempotency middleware lagata hai. Baaki middlewares (CORS, compression)
+    se PEHLE call karo - Starlette mein baad wala middleware bahar hota hai.
+    """
+    app.add_middleware(IdempotencyMiddleware, store=store)
+    return app
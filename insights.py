@@ -0,0 +1,245 @@
+"""
+🔮 Insights - spending forecast + anomaly detection
+
+- Forecast: monthly_category_totals se har category ka exponential smoothing
+  (saari categories ek matrix mein, months pe loop - rows pe nahi).
+- Anomalies: category ki history (us mahine tak) ke against robust MAD z-score,
+  NumPy arrays pe. History sirf hot table ki hai (archived saal nahi).
+
+Dono results (category, month) key se cache hote hain - month tak ka data
+hi use hota hai. Write pe ledger jo (category, month) touch karta hai, sirf
+wahi (aur uske baad ke months) dobara compute hote hain.
+"""
+
+import os
+import threading
+
+import numpy as np
+from sqlalchemy import func, select
+
+import models
+
+INSIGHTS_ALPHA = float(os.getenv("INSIGHTS_ALPHA", "0.5"))
+ANOMALY_THRESHOLD = float(os.getenv("ANOMALY_THRESHOLD", "3.5"))
+MIN_HISTORY = 5  # isse kam transactions pe anomaly nahi nikalte
+
+
+class InsightsCache:
+    """forecasts aur anomalies - dono (category, month) key se"""
+
+    def __init__(self):
+        self.forecasts = {}
+        self.anomalies = {}
+        self._epoch = 0
+        self._lock = threading.Lock()
+
+    @property
+    def epoch(self):
+        return self._epoch
+
+    def invalidate(self, keys=None):
+        """keys = {(category, month)}; None = sab clear"""
+        with self._lock:
+            self._epoch += 1
+            if keys is None:
+                self.forecasts.clear()
+                self.anomalies.clear()
+                return
+            for category, month in keys:
+                for store in (self.forecasts, self.anomalies):
+                    stale = [k for k in store if k[0] == category and k[1] >= month]
+                    for key in stale:
+                        del store[key]
+
+    def store(self, epoch, forecasts, anomalies):
+        """Compute ke beech koi write aaya ho toh stale result cache mat karo"""
+        with self._lock:
+            if epoch != self._epoch:
+                return
+            self.forecasts.update(forecasts)
+            self.anomalies.update(anomalies)
+
+
+insights_cache = InsightsCache()
+
+
+def _next_month(month):
+    year, mon = int(month[:4]), int(month[5:7])
+    return f"{year + mon // 12}-{mon % 12 + 1:02d}"
+
+def _month_range(first, last):
+    months = [first]
+    while months[-1] < last:
+        months.append(_next_month(months[-1]))
+    return months
+
+def compute_forecasts(session, categories, end_month, alpha=INSIGHTS_ALPHA):
+    """
+    Categories ke monthly totals (end_month tak) pe simple exponential smoothing.
+    Saari categories ek matrix mein - loop sirf months pe hai.
+    """
+    if not categories:
+        return {}
+    totals = models.MonthlyCategoryTotal
+    rows = session.execute(
+        select(totals.category, totals.month, totals.spent)
+        .where(totals.category.in_(categories), totals.month <= end_month)
+    ).all()
+    if not rows:
+        return {}
+
+    cats = np.array([row.category for row in rows])
+    months = np.array([row.month for row in rows])
+    spent = np.array([row.spent for row in rows], dtype=float)
+
+    all_months = _month_range(min(months.tolist()), end_month)
+    names, cat_idx = np.unique(cats, return_inverse=True)
+    month_idx = np.searchsorted(np.array(all_months), months)
+
+    # categories x months matrix (missing month = 0 kharcha)
+    grid = np.zeros((len(names), len(all_months)))
+    np.add.at(grid, (cat_idx, month_idx), spent)
+
+    # Har category apne pehle month se smooth hoti hai
+    first = np.argmax(grid > 0, axis=1)
+    level = grid[np.arange(len(names)), first]
+    for m in range(1, len(all_months)):
+        active = m > first
+        level = np.where(active, alpha * grid[:, m] + (1 - alpha) * level, level)
+
+    last = grid[:, -1]
+    forecast_month = _next_month(all_months[-1])
+    trend = np.divide(level - last, last, out=np.zeros_like(level), where=last > 0) * 100
+
+    return {
+        (name, end_month): {
+            "category": name,
+            "last_month": all_months[-1],
+            "last_spent": round(float(last[i]), 2),
+            "forecast_month": forecast_month,
+            "forecast": round(float(level[i]), 2),
+            "change_pct": round(float(trend[i]), 2),
+        }
+        for i, name in enumerate(names.tolist())
+    }
+
+def compute_anomalies(session, keys, threshold=ANOMALY_THRESHOLD):
+    """
+    keys = [(category, month)] - har key ke liye us month ke kharche ko
+    category ki history (month tak) ke median/MAD se compare karta hai.
+
+    History sirf hot transactions table se aati hai - archived saal ke rows
+    (forecasts ke rollups ke ulat) isme nahi, aur archived month ke
+    anomalies khaali aate hain.
+    """
+    if not keys:
+        return {}
+    tx = models.Transaction
+    month_col = func.substr(tx.date, 1, 7).label("month")
+    max_month = max(month for _, month in keys)
+    # (category, month) order mein - har category ek contiguous slice, months sorted
+    rows = session.execute(
+        select(tx.id, tx.category, month_col, tx.amount)
+        .where(
+            tx.category.in_({category for category, _ in keys}),
+            tx.amount < 0,
+            month_col <= max_month,
+        )
+        .order_by(tx.category, month_col)
+    ).all()
+
+    results = {key: [] for key in keys}
+    if not rows:
+        return results
+
+    id_values, category_values, month_values, amount_values = zip(*rows)
+    ids = np.fromiter(id_values, dtype=np.int64, count=len(rows))
+    cats = np.array(category_values)
+    months = np.array(month_values)
+    spent = np.abs(np.fromiter(amount_values, dtype=float, count=len(rows)))
+
+    # Ek hi pass mein category slices: names[i] -> rows[starts[i]:ends[i]]
+    names, starts = np.unique(cats, return_index=True)
+    ends = np.append(starts[1:], len(rows))
+    slices = dict(zip(names.tolist(), zip(starts.tolist(), ends.tolist())))
+
+    found = []  # (key, row indexes, scores, median)
+    for category, month in keys:
+        if category not in slices:
+            continue
+        start, end = slices[category]
+        cat_months = months[start:end]
+        month_start = start + np.searchsorted(cat_months, month, side="left")
+        month_end = start + np.searchsorted(cat_months, month, side="right")
+
+        history = spent[start:month_end]
+        if len(history) < MIN_HISTORY or month_start == month_end:
+            continue
+        median = np.median(history)
+        mad = np.median(np.abs(history - median))
+        if mad == 0:
+            continue
+
+        scores = 0.6745 * (spent[month_start:month_end] - median) / mad
+        outliers = np.flatnonzero(np.abs(scores) > threshold)
+        if len(outliers):
+            found.append(((category, month), month_start + outliers, scores[outliers], median))
+
+    if not found:
+        return results
+
+    # Sirf outliers ke poore rows (description, date) dobara laao
+    outlier_rows = np.concatenate([idx for _, idx, _, _ in found])
+    details = {
+        row.id: row
+        for row in session.execute(
+            select(tx.id, tx.description, tx.date, tx.amount).where(tx.id.in_(ids[outlier_rows].tolist()))
+        )
+    }
+    for key, idx, scores, median in found:
+        results[key] = [
+            {
+                "id": row_id,
+                "date": details[row_id].date,
+                "description": details[row_id].description,
+                "category": key[0],
+                "amount": details[row_id].amount,
+                "score": round(score, 2),
+                "category_median": round(float(median), 2),
+            }
+            for row_id, score in zip(ids[idx].tolist(), scores.tolist())
+        ]
+    return results
+
+def get_insights(session, month):
+    """Month tak ke data se forecasts + us month ke anomalies - cache se, jo missing ho wahi compute"""
+    cache = insights_cache
+    epoch = cache.epoch
+
+    totals = models.MonthlyCategoryTotal
+    all_categories = set(session.scalars(select(totals.category).where(totals.month <= month).distinct()))
+    month_categories = set(session.scalars(select(totals.category).where(totals.month == month)))
+
+    forecasts = {(c, month): cache.forecasts[(c, month)]
+                 for c in all_categories if (c, month) in cache.forecasts}
+    anomalies = {(c, month): cache.anomalies[(c, month)]
+                 for c in month_categories if (c, month) in cache.anomalies}
+
+    new_forecasts = compute_forecasts(
+        session, sorted(c for c in all_categories if (c, month) not in forecasts), month
+    )
+    new_anomalies = compute_anomalies(
+        session, [(c, month) for c in sorted(month_categories) if (c, month) not in anomalies]
+    )
+    cache.store(epoch, new_forecasts, new_anomalies)
+    forecasts.update(new_forecasts)
+    anomalies.update(new_anomalies)
+
+    return {
+        "month": month,
+        "forecasts": sorted(forecasts.values(), key=lambda f: f["category"]),
+        "anomalies": sorted(
+            (a for items in anomalies.values() for a in items),
+            key=lambda a: -abs(a["score"])
+        ),
+    }
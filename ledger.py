@@ -0,0 +1,100 @@
+"""
+📒 Ledger running totals
+
+Har insert/update/delete pe categories.total_spent, summary aur
+monthly_category_totals ko sirf delta se update karta hai - poori
+transactions table dobara scan nahi hoti. /recalculate full rebuild ke liye hai.
+
+Touched (category, month) keys session.info["touched_months"] mein jaati hain,
+taaki commit ke baad derived caches (insights) sirf unhe invalidate karein.
+"""
+
+from collections import defaultdict
+
+from sqlalchemy import bindparam, delete, func, insert, select, update
+
+import models
+from budgets import evaluate_thresholds
+from database import upsert_insert
+
+CATEGORY_COLUMNS = models.Category.__table__.c
+MONTHLY_COLUMNS = models.MonthlyCategoryTotal.__table__.c
+
+
+def month_of(date):
+    """'2024-05-17' -> '2024-05'"""
+    return date[:7]
+
+def apply_transactions(session, rows, sign=1):
+    """
+    rows ke amounts running totals mein jodta (sign=1) ya ghatata (sign=-1) hai.
+    rows mein 'amount', 'category', 'date' keys honi chahiye.
+    Touched (category, month) keys return karta hai.
+    """
+    category_deltas = defaultdict(float)
+    monthly_deltas = defaultdict(float)
+    income_delta = 0.0
+    expense_delta = 0.0
+
+    for row in rows:
+        amount = row["amount"]
+        if amount < 0:
+            spent = -amount * sign
+            category_deltas[row["category"]] += spent
+            monthly_deltas[(row["category"], month_of(row["date"]))] += spent
+            expense_delta += spent
+        elif amount > 0:
+            income_delta += amount * sign
+
+    if category_deltas:
+        session.execute(
+            update(models.Category.__table__)
+            .where(CATEGORY_COLUMNS.name == bindparam("category_name"))
+            .values(total_spent=CATEGORY_COLUMNS.total_spent + bindparam("delta")),
+            [{"category_name": name, "delta": delta} for name, delta in category_deltas.items()]
+        )
+
+    if income_delta or expense_delta:
+        session.execute(
+            update(models.Summary)
+            .where(models.Summary.id == 1)
+            .values(
+                monthly_income=models.Summary.monthly_income + income_delta,
+                total_expenses=models.Summary.total_expenses + expense_delta,
+            )
+        )
+
+    for (category, month), delta in monthly_deltas.items():
+        # Atomic upsert - concurrent writers (Postgres / multi-worker) ka update lost nahi hota
+        stmt = upsert_insert(models.MonthlyCategoryTotal).values(category=category, month=month, spent=delta)
+        new_spent = session.execute(
+            stmt.on_conflict_do_update(
+                index_elements=["category", "month"],
+                set_={"spent": MONTHLY_COLUMNS.spent + stmt.excluded.spent},
+            ).returning(MONTHLY_COLUMNS.spent)
+        ).scalar_one()
+        evaluate_thresholds(session, category, month, new_spent - delta, new_spent)
+
+    # Pending rows flush, taaki isi session ka agla apply unhe dekh sake
+    session.flush()
+    touched = set(monthly_deltas)
+    session.info.setdefault("touched_months", set()).update(touched)
+    return touched
+
+def rebuild_monthly_totals(session):
+    """monthly_category_totals ko hot ledger se dobara banata hai (archived years frozen rehte hain)"""
+    tx = models.Transaction
+    month = func.substr(tx.date, 1, 7)
+    frozen = [str(year) for year in session.scalars(select(models.ArchivedYear.year))]
+    session.execute(
+        delete(models.MonthlyCategoryTotal)
+        .where(func.substr(models.MonthlyCategoryTotal.month, 1, 4).not_in(frozen))
+    )
+    session.info["rebuilt"] = True
+    totals = session.execute(
+        select(tx.category, month.label("month"), func.sum(func.abs(tx.amount)).label("spent"))
+        .where(tx.amount < 0)
+        .group_by(tx.category, month)
+    ).mappings().all()
+    if totals:
+        session.execute(insert(models.MonthlyCategoryTotal), [dict(row) for row in totals])
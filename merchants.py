@@ -0,0 +1,79 @@
+"""
+🏪 Top merchants - SQL backend ka Space-Saving sketch (merchant_counters table)
+
+Har insert pe sirf us batch ke normalised descriptions update hote hain
+(tracked keys ka executemany +weight, naye keys ke liye bounded table load
+karke eviction). Top-K ek chhoti indexed table se aata hai - poori
+transactions table ka GROUP BY nahi.
+
+Sketch sirf inserts count karta hai; edit/delete ke baad counts thode
+purane ho sakte hain - /recalculate ya rebuild ledger se dobara banata hai.
+"""
+
+from sqlalchemy import bindparam, delete, insert, select, update
+
+import models
+from archive import archived_years, iter_archive
+from sketch import MERCHANT_SKETCH_CAPACITY, SpaceSaving, format_top, merchant_weights, normalise_description, place_new_keys
+
+COUNTER_COLUMNS = models.MerchantCounter.__table__.c
+
+
+def record_merchants(session, rows):
+    """Naye transactions (dicts: description, amount) ko sketch mein jodta hai"""
+    weights = merchant_weights(rows)
+    if not weights:
+        return
+    counters = models.MerchantCounter
+    tracked = set(session.scalars(select(counters.name).where(counters.name.in_(weights))))
+
+    if tracked:
+        session.execute(
+            update(counters.__table__)
+            .where(COUNTER_COLUMNS.name == bindparam("merchant"))
+            .values(count=COUNTER_COLUMNS.count + bindparam("weight")),
+            [{"merchant": name, "weight": weights[name]} for name in tracked]
+        )
+
+    new_weights = {name: weight for name, weight in weights.items() if name not in tracked}
+    if new_weights:
+        persisted = [tuple(row) for row in session.execute(select(counters.name, counters.count, counters.error))]
+        new_rows, evicted = place_new_keys(persisted, new_weights)
+        if evicted:
+            session.execute(delete(counters).where(counters.name.in_(evicted)))
+        if new_rows:
+            session.execute(
+                insert(counters),
+                [{"name": name, "count": count, "error": error} for name, count, error in new_rows]
+            )
+
+def top_merchants(session, k):
+    counters = models.MerchantCounter
+    rows = session.execute(
+        select(counters.name, counters.count, counters.error)
+        .order_by(counters.count.desc(), counters.name)
+        .limit(k)
+    ).all()
+    return {"k": k, "capacity": MERCHANT_SKETCH_CAPACITY, "merchants": format_top(tuple(row) for row in rows)}
+
+def rebuild_merchants(session):
+    """Hot ledger + archive files ko stream karke sketch dobara banata hai (memory bounded)"""
+    sketch = SpaceSaving()
+    tx = models.Transaction
+    hot = session.execute(
+        select(tx.description).where(tx.amount < 0).execution_options(yield_per=1000)
+    ).scalars()
+    for description in hot:
+        sketch.update(normalise_description(description))
+    for year in sorted(archived_years(session)):
+        for (description,) in iter_archive(year, "description", "WHERE amount < 0"):
+            sketch.update(normalise_description(description))
+
+    session.execute(delete(models.MerchantCounter))
+    rows = sketch.rows()
+    if rows:
+        session.execute(
+            insert(models.MerchantCounter),
+            [{"name": name, "count": count, "error": error} for name, count, error in rows]
+        )
+    return len(rows)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean
+from sqlalchemy import Column, Integer, String, Boolean, Float, LargeBinary, Text, CheckConstraint, UniqueConstraint
 from database import Base
 
 # Ye database ke andar "tasks" naam ki table banayega
@@ -9,3 +9,113 @@ class Task(Base):
     title = Column(String)
     description = Column(String)
     completed = Column(Boolean, default=False)
+
+# Ledger ki har entry (negative = kharcha, positive = income)
+class Transaction(Base):
+    __tablename__ = "transactions"
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    description = Column(String, nullable=False)
+    amount = Column(Float, nullable=False)
+    date = Column(String, nullable=False, index=True)
+    category = Column(String, nullable=False, index=True)
+    status = Column(String, default="completed")
+    # amount hamesha INR mein; foreign spend ka asli amount/currency yahan
+    currency = Column(String, nullable=False, default="INR", server_default="INR")
+    original_amount = Column(Float)
+
+# Categories + unka total kharcha
+class Category(Base):
+    __tablename__ = "categories"
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    name = Column(String, unique=True, nullable=False)
+    total_spent = Column(Float, default=0)
+    color = Column(String, nullable=False)
+
+# Dashboard summary (sirf ek row, id = 1)
+class Summary(Base):
+    __tablename__ = "summary"
+    __table_args__ = (CheckConstraint("id = 1"),)
+
+    id = Column(Integer, primary_key=True)
+    total_balance = Column(Float)
+    monthly_income = Column(Float)
+    total_expenses = Column(Float)
+
+# Category ka har mahine ka running kharcha (har write pe update hota hai)
+class MonthlyCategoryTotal(Base):
+    __tablename__ = "monthly_category_totals"
+
+    category = Column(String, primary_key=True)
+    month = Column(String, primary_key=True)  # "YYYY-MM"
+    spent = Column(Float, nullable=False, default=0)
+
+# Category ka monthly budget
+class Budget(Base):
+    __tablename__ = "budgets"
+
+    category = Column(String, primary_key=True)
+    monthly_limit = Column(Float, nullable=False)
+
+# Budget threshold (50/80/100%) cross hone ka record
+class BudgetAlert(Base):
+    __tablename__ = "budget_alerts"
+    __table_args__ = (UniqueConstraint("category", "month", "threshold"),)
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    category = Column(String, nullable=False)
+    month = Column(String, nullable=False, index=True)
+    threshold = Column(Integer, nullable=False)
+    spent = Column(Float, nullable=False)
+    monthly_limit = Column(Float, nullable=False)
+    created_at = Column(String, nullable=False)
+
+# Har din ka FX rate (1 unit currency = kitne INR)
+class FxRate(Base):
+    __tablename__ = "fx_rates"
+
+    currency = Column(String, primary_key=True)
+    day = Column(String, primary_key=True)  # "YYYY-MM-DD"
+    rate_to_inr = Column(Float, nullable=False)
+
+# Archive ho chuka saal - rollups yahan freeze ho jaate hain
+class ArchivedYear(Base):
+    __tablename__ = "archived_years"
+
+    year = Column(Integer, primary_key=True, autoincrement=False)
+    path = Column(String, nullable=False)
+    transaction_count = Column(Integer, nullable=False)
+    total_income = Column(Float, nullable=False)
+    total_expenses = Column(Float, nullable=False)
+    archived_at = Column(String, nullable=False)
+
+# Shared cache version - har write +1, workers isse apne caches sync karte hain
+class CacheVersion(Base):
+    __tablename__ = "cache_version"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    version = Column(Integer, nullable=False, default=0)
+
+# Top merchants ka Space-Saving sketch - bounded (MERCHANT_SKETCH_CAPACITY rows)
+class MerchantCounter(Base):
+    __tablename__ = "merchant_counters"
+
+    name = Column(String, primary_key=True)  # normalised description
+    count = Column(Integer, nullable=False, index=True)
+    error = Column(Integer, nullable=False, default=0)  # count isse zyada over-estimate nahi
+
+# Idempotency-Key -> pehli baar ka response (retry pe replay)
+class IdempotencyRecord(Base):
+    __tablename__ = "idempotency_keys"
+
+    key = Column(String, primary_key=True)
+    fingerprint = Column(String, nullable=False)  # method + path + body ka hash
+    status_code = Column(Integer)  # NULL = request abhi chal rahi hai
+    committed = Column(Boolean, nullable=False, default=False)  # handler ka write commit ho chuka
+    headers = Column(Text)  # JSON [[name, value]]
+    body = Column(LargeBinary)
+    created_at = Column(Float, nullable=False, index=True)
+    expires_at = Column(Float, nullable=False, index=True)
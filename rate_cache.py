@@ -0,0 +1,49 @@
+"""
+💱 FX rate cache - dono backends (SQL + Mongo) ka shared hissa
+
+(currency, day) -> resolved rate_to_inr (us din ya usse pehle ka latest).
+Koi DB import nahi, isliye Mongo backend bhi bina SQLAlchemy ke use karta hai.
+"""
+
+import threading
+
+BASE_CURRENCY = "INR"
+
+
+class MissingRateError(ValueError):
+    """Kisi (currency, day) ke liye koi rate nahi mila"""
+
+
+class FxCache:
+    """(currency, day) -> rate_to_inr ka in-process cache"""
+
+    def __init__(self):
+        self._rates = {}
+        self._epoch = 0
+        self._lock = threading.Lock()
+
+    @property
+    def epoch(self):
+        return self._epoch
+
+    def get_many(self, keys):
+        with self._lock:
+            return {key: self._rates[key] for key in keys if key in self._rates}
+
+    def put_many(self, rates, epoch=None):
+        """Lookup ke beech invalidate hua ho toh purane rates cache mat karo"""
+        with self._lock:
+            if epoch is not None and epoch != self._epoch:
+                return
+            self._rates.update(rates)
+
+    def invalidate(self, currencies=None):
+        """Naye rates aane pe us currency ke resolved rates hata do"""
+        with self._lock:
+            self._epoch += 1
+            if currencies is None:
+                self._rates.clear()
+                return
+            currencies = set(currencies)
+            for key in [k for k in self._rates if k[0] in currencies]:
+                del self._rates[key]
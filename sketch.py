@@ -0,0 +1,106 @@
+"""
+📈 Heavy hitters - Space-Saving sketch (top merchants / descriptions)
+
+Fixed capacity ke counters rakhta hai, isliye memory/storage bounded hai
+chahe ledger kitna bhi bada ho. Har counter (count, error) hai:
+count - error <= asli count <= count.
+
+Persisted counters (SQL table / Mongo collection) pe hi kaam hota hai -
+already tracked key sirf +weight hoti hai, naye keys ke liye bounded counters
+load karke eviction yahan hoti hai. Dono backends yahi code use karte hain.
+"""
+
+import heapq
+import os
+import re
+
+MERCHANT_SKETCH_CAPACITY = int(os.getenv("MERCHANT_SKETCH_CAPACITY", "500"))
+
+# UPI/card/bank wale prefixes jo merchant ka naam nahi hain
+_NOISE_PREFIXES = re.compile(r"^(upi|pos|neft|imps|rtgs|ach|nach|ecom|card|txn|payment to|paid to)\b[\s/:*-]*")
+_NOISE_CHARS = re.compile(r"[^a-z& ]+")
+_SPACES = re.compile(r"\s+")
+
+
+def normalise_description(description):
+    """'UPI/Swiggy*Order 8271' -> 'swiggy order'"""
+    text = (description or "").lower().strip()
+    previous = None
+    while previous != text:
+        previous = text
+        text = _NOISE_PREFIXES.sub("", text)
+    text = _SPACES.sub(" ", _NOISE_CHARS.sub(" ", text)).strip()
+    # Pehle 3 words kaafi hain - baaki aksar order/ref details hoti hain
+    return " ".join(text.split(" ")[:3]) or "unknown"
+
+def merchant_weights(rows):
+    """Sirf kharche (amount < 0) - normalised description -> batch mein kitni baar"""
+    weights = {}
+    for row in rows:
+        if row["amount"] < 0:
+            key = normalise_description(row["description"])
+            weights[key] = weights.get(key, 0) + 1
+    return weights
+
+
+class SpaceSaving:
+    """
+    Space-Saving (Metwally et al.) - capacity bhar jaye toh sabse chhota
+    counter naye key ko mil jata hai. Min ke liye lazy min-heap, isliye
+    update amortised O(log capacity).
+    """
+
+    def __init__(self, capacity=MERCHANT_SKETCH_CAPACITY, rows=()):
+        self.capacity = capacity
+        self.counters = {key: [count, error] for key, count, error in rows}  # key -> [count, error]
+        self._rebuild_heap()
+
+    def _rebuild_heap(self):
+        self._heap = [(count, key) for key, (count, _) in self.counters.items()]
+        heapq.heapify(self._heap)
+
+    def _pop_min(self):
+        # Heap mein purane counts bhi pade rehte hain - wo skip
+        while True:
+            count, key = heapq.heappop(self._heap)
+            current = self.counters.get(key)
+            if current is not None and current[0] == count:
+                return key
+
+    def update(self, key, weight=1):
+        counter = self.counters.get(key)
+        if counter is not None:
+            counter[0] += weight
+        elif len(self.counters) < self.capacity:
+            counter = self.counters[key] = [weight, 0]
+        else:
+            floor = self.counters.pop(self._pop_min())[0]
+            counter = self.counters[key] = [floor + weight, floor]
+
+        heapq.heappush(self._heap, (counter[0], key))
+        if len(self._heap) > 4 * self.capacity:
+            self._rebuild_heap()
+
+    def rows(self, keys=None):
+        """[(key, count, error)] - keys di ho toh sirf unke (jo abhi tracked hain)"""
+        keys = self.counters if keys is None else [k for k in keys if k in self.counters]
+        return [(key, *self.counters[key]) for key in keys]
+
+
+def place_new_keys(persisted, new_weights, capacity=MERCHANT_SKETCH_CAPACITY):
+    """
+    persisted = [(key, count, error)] (saare stored counters),
+    new_weights = {key: weight} un keys ke jo abhi tracked nahi hain.
+    Return: (insert karne wale rows, delete karne wale evicted keys).
+    """
+    sketch = SpaceSaving(capacity, persisted)
+    for key, weight in new_weights.items():
+        sketch.update(key, weight)
+    evicted = [key for key, _, _ in persisted if key not in sketch.counters]
+    return sketch.rows(new_weights), evicted
+
+def format_top(rows):
+    return [
+        {"name": key, "count": count, "min_count": count - error}
+        for key, count, error in rows
+    ]
@@ -0,0 +1,151 @@
+"""
+🗃️ SQL stores - sirf dev_api (SQLAlchemy backend) ke liye
+
+- SqlIdempotencyStore: idempotency_keys table (idempotency.py ke middleware ka store)
+- sync_cache_version / bump_cache_version: cache_version row (coherence.py ka shared version)
+
+Mongo backend ke equivalents idempotency.py / coherence.py mein hi hain -
+wo modules SQLAlchemy import nahi karte, isliye ye code yahan alag hai.
+"""
+
+import json
+import time
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import IntegrityError
+
+import models
+from coherence import coherence
+from idempotency import (
+    IDEMPOTENCY_MAX_RECORDS, IDEMPOTENCY_PURGE_EVERY, IDEMPOTENCY_TTL, current_key, reclaimable,
+)
+
+
+# ============================================================================
+# 🔁 CACHE VERSION
+# ============================================================================
+
+def sync_cache_version(session):
+    """Read se pehle - interval beet gaya ho toh shared version check"""
+    if coherence.due():
+        coherence.observe(session.scalar(select(models.CacheVersion.version).where(models.CacheVersion.id == 1)))
+
+def bump_cache_version(session):
+    """Write transaction ke andar version +1 (commit ke saath hi dikhega)"""
+    session.execute(
+        update(models.CacheVersion)
+        .where(models.CacheVersion.id == 1)
+        .values(version=models.CacheVersion.version + 1)
+    )
+    return session.scalar(select(models.CacheVersion.version).where(models.CacheVersion.id == 1))
+
+# ============================================================================
+# 🔑 IDEMPOTENCY
+# ============================================================================
+
+class SqlIdempotencyStore:
+    """idempotency_keys table. run = blocking kaam kahan chale (dev_api mein writer pool)"""
+
+    def __init__(self, session_factory, run, ttl=IDEMPOTENCY_TTL, max_records=IDEMPOTENCY_MAX_RECORDS):
+        self.session_factory = session_factory
+        self.run = run
+        self.ttl = ttl
+        self.max_records = max_records
+        self._claims = 0
+
+    @staticmethod
+    def _as_record(row):
+        return {
+            "fingerprint": row.fingerprint,
+            "status_code": row.status_code,
+            "committed": bool(row.committed),
+            "headers": json.loads(row.headers) if row.headers else [],
+            "body": row.body,
+            "created_at": row.created_at,
+            "expires_at": row.expires_at,
+        }
+
+    def claim(self, key, fingerprint):
+        """Key hamari ho gayi toh None, warna existing record"""
+        now = time.time()
+        fresh = {"fingerprint": fingerprint, "status_code": None, "committed": False, "headers": None,
+                 "body": None, "created_at": now, "expires_at": now + self.ttl}
+        records = models.IdempotencyRecord
+
+        with self.session_factory() as session:
+            existing = session.get(records, key)
+            if existing is None:
+                session.add(records(key=key, **fresh))
+            else:
+                record = self._as_record(existing)
+                if not reclaimable(record, now):
+                    return record
+                # Purane created_at pe conditional - do workers ek saath reclaim na karein
+                result = session.execute(
+                    update(records)
+                    .where(records.key == key, records.created_at == existing.created_at)
+                    .values(**fresh)
+                )
+                if result.rowcount == 0:
+                    session.rollback()
+                    return self.get(key)
+            try:
+                session.commit()
+            except IntegrityError:
+                session.rollback()
+                return self.get(key)
+
+        self._claims += 1
+        if self._claims % IDEMPOTENCY_PURGE_EVERY == 0:
+            self.purge()
+        return None
+
+    def get(self, key):
+        with self.session_factory() as session:
+            row = session.get(models.IdempotencyRecord, key)
+            return self._as_record(row) if row is not None else None
+
+    def mark_committed(self, session):
+        """
+        Write transaction ke andar (commit se pehle) - agar request ke paas claimed
+        key hai toh record committed mark. Ledger change ke saath hi commit hota hai,
+        isliye crash ke baad retry pata kar sakta hai ki dobara chalana safe nahi.
+        """
+        key = current_key.get()
+        if key is not None:
+            session.execute(
+                update(models.IdempotencyRecord)
+                .where(models.IdempotencyRecord.key == key)
+                .values(committed=True)
+            )
+
+    def complete(self, key, status_code, headers, body):
+        with self.session_factory() as session:
+            session.execute(
+                update(models.IdempotencyRecord)
+                .where(models.IdempotencyRecord.key == key)
+                .values(status_code=status_code, headers=json.dumps(headers), body=body)
+            )
+            session.commit()
+
+    def release(self, key):
+        with self.session_factory() as session:
+            # Commit ho chuka placeholder nahi hatta - retry se duplicate write ho jata
+            session.execute(
+                delete(models.IdempotencyRecord)
+                .where(
+                    models.IdempotencyRecord.key == key,
+                    models.IdempotencyRecord.status_code.is_(None),
+                    models.IdempotencyRecord.committed.is_(False),
+                )
+            )
+            session.commit()
+
+    def purge(self):
+        """Expired records hatao + max_records se zyada ho toh sabse purane"""
+        records = models.IdempotencyRecord
+        with self.session_factory() as session:
+            session.execute(delete(records).where(records.expires_at <= time.time()))
+            overflow = select(records.key).order_by(records.created_at.desc()).offset(self.max_records)
+            session.execute(delete(records).where(records.key.in_(overflow.scalar_subquery())))
+            session.commit()